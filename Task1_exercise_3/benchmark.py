@@ -0,0 +1,50 @@
+"""
+Micro-benchmark of the split-based and byte-level user agent parsers
+"""
+import gzip
+import time
+import argparse
+from collections import Counter
+
+from main import iter_user_agents, parse_log_file
+
+def count_lines(file_path):
+    """Counting lines of the decompressed file"""
+    with gzip.open(file_path, 'rb') as file:
+        return sum(block.count(b"\n") for block in iter(lambda: file.read(1024 * 1024), b""))
+
+def split_parser(file_path):
+    """Current parser, text lines split on quotes"""
+    return Counter(iter_user_agents(file_path))
+
+def time_parser(parser, file_path, repeat):
+    """Best time of repeat runs and the counter of the last run"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = parser(file_path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main_benchmark():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Compare user agent parsers in lines/sec.")
+    parser.add_argument("file", nargs="?", default="access.log.5.gz", help="Gzipped access log file.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per parser, the best one counts.")
+    args = parser.parse_args()
+
+    lines = count_lines(args.file)
+    split_time, split_result = time_parser(split_parser, args.file, args.repeat)
+    bytes_time, bytes_result = time_parser(parse_log_file, args.file, args.repeat)
+
+    print(f"{lines} lines, best of {args.repeat} runs")
+    print(f"{'parser':>8} {'lines/s':>12} {'seconds':>9}")
+    print(f"{'split':>8} {lines / split_time:>12.0f} {split_time:>9.4f}")
+    print(f"{'bytes':>8} {lines / bytes_time:>12.0f} {bytes_time:>9.4f}")
+    print(f"speedup: {split_time / bytes_time:.2f}x")
+    if split_result != bytes_result:
+        print("Warning: parsers disagree on the user agent counts")
+
+if __name__ == "__main__":
+    main_benchmark()
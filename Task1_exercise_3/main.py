@@ -1,24 +1,37 @@
 """
 Imports
 """
+import os
+import glob
 import argparse
 from collections import Counter
+from datetime import datetime
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 import gzip
 import logging
 
-def parse_log_file(file_path):
+from sketches import ApproximateCounter
+
+# Read size of the byte-level parser, a block holds thousands of lines
+BLOCK_SIZE = 1024 * 1024
+
+# Everything one pass can aggregate, selected with the CLI flags of the same name
+DIMENSIONS = ("agents", "ips", "paths", "status", "bytes", "minutes")
+# Dimensions with unbounded distinct keys, sketched with --approximate
+APPROXIMATE_DIMENSIONS = ("agents", "ips", "paths")
+
+def iter_user_agents(file_path):
     """
-    Geeting right lines from file and checking general errors
+    Yielding user agents one line at a time, nothing is kept in memory
     """
-    user_agents = []
     try:
         with gzip.open(file_path, 'rt', encoding='utf-8') as file:
             for line in file:
                 try:
                     parts = line.split('"')
                     if len(parts) > 5:
-                        user_agent = parts[5].strip()
-                        user_agents.append(user_agent)
+                        yield parts[5].strip()
                 except IndexError as index_error:
                     logging.warning("Skipping malformed line: %s - %s", line.strip(), index_error)
                 except UnicodeDecodeError:
@@ -26,29 +39,290 @@ def parse_log_file(file_path):
     except (OSError, gzip.BadGzipFile) as file_error:
         logging.error("Error opening file %s: %s", file_path, file_error)
 
-    return user_agents
-def calculate_statistics(user_agents):
+def _user_agent_fields(lines):
+    # User agent is the sixth field of a combined-format line split on quotes,
+    # maxsplit stops the split right after it
+    return (parts[5] for parts in (line.split(b'"', 6) for line in lines) if len(parts) > 5)
+
+def iter_line_blocks(file_path, block_size=BLOCK_SIZE):
+    """
+    Yielding lists of raw lines, reading the decompressed file in large blocks
+    """
+    try:
+        with gzip.open(file_path, 'rb') as file:
+            tail = b""
+            while True:
+                block = file.read(block_size)
+                if not block:
+                    break
+                lines = (tail + block).split(b"\n")
+                # A line cut by the block boundary waits for the next block
+                tail = lines.pop()
+                yield lines
+            if tail:
+                yield [tail]
+    except (OSError, EOFError, gzip.BadGzipFile) as file_error:
+        logging.error("Error opening file %s: %s", file_path, file_error)
+
+def _analyze_lines(lines, result):
+    # Combined format split on quotes: address and time, request, status and
+    # size, referer, user agent
+    agents = result.get("agents")
+    ips = result.get("ips")
+    paths = result.get("paths")
+    statuses = result.get("status")
+    minutes = result.get("minutes")
+    count_bytes = "bytes" in result
+    total_bytes = 0
+    for line in lines:
+        if not line:
+            continue
+        parts = line.split(b'"', 6)
+        head = parts[0]
+        if ips is not None:
+            ips[head.split(b" ", 1)[0]] += 1
+        if minutes is not None:
+            start = head.find(b"[")
+            if start >= 0:
+                # dd/Mon/yyyy:HH:MM
+                minutes[head[start + 1:start + 18]] += 1
+        if len(parts) > 2:
+            if paths is not None:
+                request = parts[1].split(b" ", 2)
+                if len(request) > 1:
+                    paths[request[1].split(b"?", 1)[0]] += 1
+            if statuses is not None or count_bytes:
+                fields = parts[2].split()
+                if fields and statuses is not None:
+                    statuses[fields[0]] += 1
+                if len(fields) > 1 and fields[1].isdigit():
+                    total_bytes += int(fields[1])
+        if agents is not None and len(parts) > 5:
+            agents[parts[5]] += 1
+    if count_bytes:
+        result["bytes"] += total_bytes
+
+def analyze_file(file_path, dimensions=("agents",), approximate=False, precision=14, capacity=1000):
+    """
+    Aggregating the selected dimensions of one file in a single pass,
+    keys stay raw bytes until decode_result(). With approximate, agents,
+    IPs and paths go into fixed-size sketches instead of exact counters.
+    """
+    result = {"requests": 0}
+    for dimension in dimensions:
+        result[dimension] = 0 if dimension == "bytes" else Counter()
+    sketches = {}
+    if approximate:
+        for dimension in dimensions:
+            if dimension in APPROXIMATE_DIMENSIONS:
+                sketches[dimension] = ApproximateCounter(precision, capacity)
+
+    agents_only = set(dimensions) == {"agents"}
+    for lines in iter_line_blocks(file_path):
+        # Blank lines are not requests, _analyze_lines skips them as well
+        result["requests"] += len(lines) - lines.count(b"")
+        if agents_only:
+            result["agents"].update(_user_agent_fields(lines))
+        else:
+            _analyze_lines(lines, result)
+        # Exact counts of one block are bounded by the block size,
+        # the sketches keep the running totals
+        for dimension, sketch in sketches.items():
+            sketch.update(result[dimension])
+            result[dimension] = Counter()
+    result.update(sketches)
+    return result
+
+def merge_results(total, partial_result):
+    """
+    Adding the counters and totals of one partial result into total
+    """
+    for key, value in partial_result.items():
+        if isinstance(value, Counter):
+            total.setdefault(key, Counter()).update(value)
+        elif isinstance(value, ApproximateCounter):
+            if key in total:
+                total[key].merge(value)
+            else:
+                total[key] = value
+        else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+def decode_result(result):
+    """
+    Decoding counter keys once per distinct key, bad bytes are replaced per field
+    """
+    decoded = {}
+    for key, value in result.items():
+        if isinstance(value, ApproximateCounter):
+            value = value.map_keys(lambda raw_key: raw_key.decode('utf-8', errors='replace').strip())
+        elif isinstance(value, Counter):
+            counter = Counter()
+            for raw_key, count in value.items():
+                counter[raw_key.decode('utf-8', errors='replace').strip()] += count
+            value = counter
+        decoded[key] = value
+    return decoded
+
+def parse_log_file(file_path):
+    """
+    Counting user agents while the file is read, memory grows with the
+    number of distinct agents and not with the number of lines.
+    Only distinct agents are decoded, bad bytes are replaced per field.
+    """
+    return decode_result(analyze_file(file_path))["agents"]
+
+def expand_paths(paths):
+    """
+    Expanding globs and directories into a sorted list of gzipped log files
+    """
+    file_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            file_paths.extend(glob.glob(os.path.join(path, "*.gz")))
+        elif glob.has_magic(path):
+            file_paths.extend(glob.glob(path))
+        else:
+            file_paths.append(path)
+    # The same file can be reached by different paths ("access.log.5.gz" and
+    # "./access.log.5.gz"), deduplicate on the resolved path
+    unique_paths = {}
+    for path in file_paths:
+        unique_paths.setdefault(os.path.realpath(path), path)
+    return sorted(unique_paths.values())
+
+def analyze_files(file_paths, dimensions=("agents",), workers=None, approximate=False,
+                  precision=14, capacity=1000):
+    """
+    Analyzing each file in a worker process and merging the partial results
+    """
+    analyze = partial(analyze_file, dimensions=tuple(dimensions), approximate=approximate,
+                      precision=precision, capacity=capacity)
+    workers = min(workers or os.cpu_count() or 1, len(file_paths))
+    if workers <= 1:
+        partials = map(analyze, file_paths)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        partials = executor.map(analyze, file_paths)
+
+    result = {}
+    try:
+        for partial_result in partials:
+            merge_results(result, partial_result)
+    finally:
+        if workers > 1:
+            executor.shutdown()
+    return decode_result(result)
+
+def calculate_statistics(user_agent_counter):
     """
     Calculation of unique users
     """
-    user_agent_counter = Counter(user_agents)
     total_unique_user_agents = len(user_agent_counter)
     return total_unique_user_agents, user_agent_counter
 
+def _minute_key(minute):
+    try:
+        return datetime.strptime(minute, "%d/%b/%Y:%H:%M")
+    except ValueError:
+        return datetime.max
+
+def _print_counts(counter, top):
+    if isinstance(counter, ApproximateCounter):
+        # Sketch counts are upper bounds, the true count is at least count - error
+        for item, count, error in counter.most_common(top):
+            if error:
+                print(f"{item}: {count - error}-{count} requests")
+            else:
+                print(f"{item}: {count} requests")
+    else:
+        for item, count in counter.most_common(top):
+            print(f"{item}: {count} requests")
+
+def _unique(counter):
+    if isinstance(counter, ApproximateCounter):
+        return f"~{len(counter)}"
+    return str(len(counter))
+
+def print_report(result, dimensions, top=None):
+    """
+    Printing the selected dimensions, the user agent part in the original format
+    """
+    if dimensions != ["agents"]:
+        print(f"Total Requests: {result['requests']}")
+
+    if "agents" in dimensions:
+        total_unique_user_agents, user_agent_counter = calculate_statistics(result["agents"])
+        if isinstance(user_agent_counter, ApproximateCounter):
+            print(f"Total Unique User Agents: ~{total_unique_user_agents}")
+        else:
+            print(f"Total Unique User Agents: {total_unique_user_agents}")
+        print("\nUser Agent Statistics:")
+        _print_counts(user_agent_counter, top)
+
+    if "ips" in dimensions:
+        print(f"\nTop IPs ({_unique(result['ips'])} unique):")
+        _print_counts(result["ips"], top)
+
+    if "paths" in dimensions:
+        print(f"\nTop Paths ({_unique(result['paths'])} unique):")
+        _print_counts(result["paths"], top)
+
+    if "status" in dimensions:
+        print("\nStatus Codes:")
+        for status, count in sorted(result["status"].items()):
+            print(f"{status}: {count} requests")
+
+    if "bytes" in dimensions:
+        average = result["bytes"] / result["requests"] if result["requests"] else 0
+        print(f"\nBytes Transferred: {result['bytes']} ({average:.1f} per request)")
+
+    if "minutes" in dimensions:
+        print("\nRequests per Minute:")
+        for minute in sorted(result["minutes"], key=_minute_key):
+            print(f"{minute}: {result['minutes'][minute]} requests")
+
 def main():
     """
     Main parser
     """
-    parser = argparse.ArgumentParser(description="Analyze access log for User Agent statistics.")
-    parser.add_argument("file", type=str, help="Path to the access log file (gzipped).")
+    parser = argparse.ArgumentParser(description="Analyze access logs in a single pass (user agents by default).")
+    parser.add_argument("files", type=str, nargs="+",
+                        help="Gzipped access log files, glob patterns or directories of .gz files.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes, one file per worker at a time (default: number of CPUs).")
+    parser.add_argument("--agents", action="store_true", help="Count user agents.")
+    parser.add_argument("--ips", action="store_true", help="Count requests per client IP.")
+    parser.add_argument("--paths", action="store_true", help="Count requests per path, without query string.")
+    parser.add_argument("--status", action="store_true", help="Count responses per status code.")
+    parser.add_argument("--bytes", action="store_true", help="Sum response bytes.")
+    parser.add_argument("--per-minute", dest="minutes", action="store_true", help="Count requests per minute.")
+    parser.add_argument("--top", type=int, default=None,
+                        help="Show only the N most frequent entries (default: all, 20 with --approximate).")
+    parser.add_argument("--approximate", action="store_true",
+                        help="Estimate unique and top agents, IPs and paths with fixed-size sketches.")
+    parser.add_argument("--precision", type=int, default=14,
+                        help="HyperLogLog precision for --approximate, uses 2^N bytes (4-18).")
+    parser.add_argument("--capacity", type=int, default=1000,
+                        help="Items tracked per dimension for --approximate top entries.")
     args = parser.parse_args()
-    user_agents = parse_log_file(args.file)
-    total_unique_user_agents, user_agent_counter = calculate_statistics(user_agents)
-
-    print(f"Total Unique User Agents: {total_unique_user_agents}")
-    print("\nUser Agent Statistics:")
-    for user_agent, count in user_agent_counter.most_common():
-        print(f"{user_agent}: {count} requests")
+    file_paths = expand_paths(args.files)
+    if not file_paths:
+        parser.error("no log files found")
+    dimensions = [dimension for dimension in DIMENSIONS if getattr(args, dimension)] or ["agents"]
+    if args.top is not None and args.top < 1:
+        parser.error("--top must be positive")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be positive")
+    if args.approximate and not 4 <= args.precision <= 18:
+        parser.error("--precision must be between 4 and 18")
+    if args.approximate and args.capacity < 1:
+        parser.error("--capacity must be positive")
+    result = analyze_files(file_paths, dimensions, args.workers, args.approximate,
+                           args.precision, args.capacity)
+    top = args.top if args.top is not None or not args.approximate else 20
+    print_report(result, dimensions, top)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,131 @@
+"""
+Fixed-size sketches for counting over logs too large for an exact Counter
+"""
+import heapq
+import math
+from hashlib import blake2b
+
+class HyperLogLog:
+    """
+    Estimating the number of distinct items in 2 ** precision one-byte
+    registers, with a standard error of about 1.04 / sqrt(2 ** precision).
+    Two sketches of the same precision merge by taking register maxima.
+    """
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, item):
+        value = int.from_bytes(blake2b(item, digest_size=8).digest(), "big")
+        index = value >> (64 - self.precision)
+        rest_bits = 64 - self.precision
+        rank = rest_bits - (value & ((1 << rest_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0 ** -register for register in self.registers)
+        empty = self.registers.count(0)
+        # Linear counting is more accurate while many registers are still empty
+        if estimate <= 2.5 * size and empty:
+            return round(size * math.log(size / empty))
+        return round(estimate)
+
+class SpaceSaving:
+    """
+    Heavy hitters kept in at most capacity counters.
+
+    Every kept item has an upper-bound count and the most it may be
+    overcounted by. Items dropped when the summary is full leave their
+    count as a floor for items that come later, so any item seen more than
+    total / capacity times is guaranteed to be kept. Batches of exact counts
+    and other summaries are folded in with the same mergeable-summary rule.
+    """
+    def __init__(self, capacity=1000):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+
+    def _floor(self):
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def _merge(self, counts, errors, floor, total):
+        own_floor = self._floor()
+        merged_counts = {}
+        merged_errors = {}
+        for item in self.counts.keys() | counts.keys():
+            merged_counts[item] = self.counts.get(item, own_floor) + counts.get(item, floor)
+            merged_errors[item] = self.errors.get(item, own_floor) + errors.get(item, floor)
+        if len(merged_counts) > self.capacity:
+            kept = heapq.nlargest(self.capacity, merged_counts, key=merged_counts.get)
+            merged_counts = {item: merged_counts[item] for item in kept}
+            merged_errors = {item: merged_errors[item] for item in kept}
+        self.counts = merged_counts
+        self.errors = merged_errors
+        self.total += total
+
+    def update(self, counts):
+        """Folding in a mapping of exact item counts"""
+        self._merge(counts, {}, 0, sum(counts.values()))
+
+    def merge(self, other):
+        self._merge(other.counts, other.errors, other._floor(), other.total)
+        return self
+
+    def most_common(self, n=None):
+        """(item, count, error) triples, the true count is between count - error and count"""
+        items = sorted(self.counts, key=self.counts.get, reverse=True)[:n]
+        return [(item, self.counts[item], self.errors[item]) for item in items]
+
+class ApproximateCounter:
+    """
+    Distinct count and top items of a stream in bounded memory, fed with
+    batches of exact counts; mergeable across files and worker processes
+    """
+    def __init__(self, precision=14, capacity=1000):
+        self.distinct = HyperLogLog(precision)
+        self.heavy_hitters = SpaceSaving(capacity)
+
+    def update(self, counts):
+        self.distinct.update(counts)
+        self.heavy_hitters.update(counts)
+
+    def merge(self, other):
+        self.distinct.merge(other.distinct)
+        self.heavy_hitters.merge(other.heavy_hitters)
+        return self
+
+    def __len__(self):
+        return self.distinct.count()
+
+    def most_common(self, n=None):
+        return self.heavy_hitters.most_common(n)
+
+    def map_keys(self, func):
+        """Copy with every kept item passed through func, e.g. to decode bytes"""
+        mapped = ApproximateCounter(self.distinct.precision, self.heavy_hitters.capacity)
+        mapped.distinct = self.distinct
+        summary = mapped.heavy_hitters
+        summary.total = self.heavy_hitters.total
+        for item, count, error in self.heavy_hitters.most_common():
+            key = func(item)
+            summary.counts[key] = summary.counts.get(key, 0) + count
+            summary.errors[key] = summary.errors.get(key, 0) + error
+        return mapped
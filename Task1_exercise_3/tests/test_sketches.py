@@ -0,0 +1,143 @@
+import os
+import random
+import sys
+import unittest
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sketches import HyperLogLog, SpaceSaving, ApproximateCounter
+
+def make_stream(size, distinct, seed=7):
+    """Skewed stream of byte keys, a few heavy hitters and a long tail"""
+    rng = random.Random(seed)
+    keys = [b"agent-%d" % i for i in range(distinct)]
+    weights = [1.0 / (rank + 1) for rank in range(distinct)]
+    return rng.choices(keys, weights, k=size)
+
+def make_batches(stream, batch_size):
+    return [Counter(stream[i:i + batch_size]) for i in range(0, len(stream), batch_size)]
+
+class HyperLogLogTest(unittest.TestCase):
+    def assert_close(self, estimate, exact, tolerance):
+        self.assertLessEqual(abs(estimate - exact), exact * tolerance,
+                             f"estimate {estimate} too far from {exact}")
+
+    def test_estimate_close_to_exact_count(self):
+        for distinct in (100, 5000, 50000):
+            with self.subTest(distinct=distinct):
+                sketch = HyperLogLog(precision=14)
+                sketch.update(b"user-%d" % i for i in range(distinct))
+                # Standard error is about 0.8% at precision 14
+                self.assert_close(sketch.count(), distinct, 0.03)
+
+    def test_duplicates_do_not_change_estimate(self):
+        once = HyperLogLog(precision=12)
+        once.update(b"user-%d" % i for i in range(2000))
+        repeated = HyperLogLog(precision=12)
+        for _ in range(3):
+            repeated.update(b"user-%d" % i for i in range(2000))
+        self.assertEqual(once.count(), repeated.count())
+
+    def test_merge_matches_single_sketch(self):
+        whole = HyperLogLog(precision=12)
+        whole.update(b"user-%d" % i for i in range(10000))
+        parts = []
+        # Overlapping parts, as when the same user shows up in several files
+        for start in range(0, 10000, 2500):
+            part = HyperLogLog(precision=12)
+            part.update(b"user-%d" % i for i in range(start, min(start + 5000, 10000)))
+            parts.append(part)
+        merged = HyperLogLog(precision=12)
+        for part in parts:
+            merged.merge(part)
+        self.assertEqual(merged.registers, whole.registers)
+
+    def test_merge_rejects_different_precision(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(precision=10).merge(HyperLogLog(precision=12))
+
+class SpaceSavingTest(unittest.TestCase):
+    def setUp(self):
+        self.stream = make_stream(20000, 3000)
+        self.exact = Counter(self.stream)
+
+    def assert_bounds(self, summary):
+        for item, count, error in summary.most_common():
+            self.assertLessEqual(count - error, self.exact[item], item)
+            self.assertGreaterEqual(count, self.exact[item], item)
+
+    def test_most_common_bounds_hold(self):
+        summary = SpaceSaving(capacity=100)
+        for batch in make_batches(self.stream, 500):
+            summary.update(batch)
+        self.assertEqual(summary.total, len(self.stream))
+        self.assertLessEqual(len(summary.counts), 100)
+        self.assert_bounds(summary)
+
+    def test_frequent_items_are_kept(self):
+        capacity = 100
+        summary = SpaceSaving(capacity)
+        for batch in make_batches(self.stream, 500):
+            summary.update(batch)
+        kept = {item for item, _, _ in summary.most_common()}
+        threshold = len(self.stream) / capacity
+        for item, count in self.exact.items():
+            if count > threshold:
+                self.assertIn(item, kept)
+
+    def test_exact_below_capacity(self):
+        summary = SpaceSaving(capacity=5000)
+        for batch in make_batches(self.stream, 500):
+            summary.update(batch)
+        self.assertEqual(summary.counts, dict(self.exact))
+        self.assertTrue(all(error == 0 for error in summary.errors.values()))
+
+class MergeAcrossWorkersTest(unittest.TestCase):
+    """Workers finish in any order, the merged result must not depend on it"""
+    def setUp(self):
+        self.stream = make_stream(30000, 4000, seed=11)
+        self.exact = Counter(self.stream)
+        self.workers = []
+        for batch in make_batches(self.stream, 10000):
+            counter = ApproximateCounter(precision=12, capacity=200)
+            for chunk in make_batches(list(batch.elements()), 1000):
+                counter.update(chunk)
+            self.workers.append(counter)
+
+    def merge_in_order(self, order):
+        merged = ApproximateCounter(precision=12, capacity=200)
+        for index in order:
+            merged.merge(self.workers[index])
+        return merged
+
+    def merge_grouped(self):
+        # (a + b) + c against a + (b + c)
+        a, b, c = self.workers
+        right = ApproximateCounter(precision=12, capacity=200).merge(b).merge(c)
+        return ApproximateCounter(precision=12, capacity=200).merge(a).merge(right)
+
+    def test_distinct_count_independent_of_merge_order(self):
+        results = [self.merge_in_order(order) for order in ((0, 1, 2), (2, 1, 0), (1, 2, 0))]
+        results.append(self.merge_grouped())
+        registers = {bytes(result.distinct.registers) for result in results}
+        self.assertEqual(len(registers), 1)
+        self.assertLessEqual(abs(len(results[0]) - len(self.exact)), len(self.exact) * 0.06)
+
+    def test_bounds_hold_in_any_merge_order(self):
+        results = [self.merge_in_order(order) for order in ((0, 1, 2), (2, 1, 0), (1, 2, 0))]
+        results.append(self.merge_grouped())
+        for result in results:
+            self.assertEqual(result.heavy_hitters.total, len(self.stream))
+            for item, count, error in result.most_common():
+                self.assertLessEqual(count - error, self.exact[item])
+                self.assertGreaterEqual(count, self.exact[item])
+
+    def test_top_items_independent_of_merge_order(self):
+        expected = [item for item, _ in self.exact.most_common(10)]
+        for order in ((0, 1, 2), (2, 1, 0), (1, 2, 0)):
+            merged = self.merge_in_order(order)
+            self.assertEqual([item for item, _, _ in merged.most_common(10)], expected)
+
+if __name__ == "__main__":
+    unittest.main()
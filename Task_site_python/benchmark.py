@@ -0,0 +1,302 @@
+"""
+Load test for the pizza server
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import http.client
+from contextlib import redirect_stdout
+
+import main
+from security.TokenManager import TokenManager
+
+# Share of each call in the mixed workload, picked per request by weight
+MIXED_WORKLOAD = (
+    ("GET /menu", 50),
+    ("GET /order/status", 20),
+    ("POST /order", 15),
+    ("POST /login", 5),
+    ("GET /orders", 5),
+    ("DELETE /menu/{id}", 5),
+)
+PERCENTILES = (50, 95, 99)
+
+def prepare_data_dir(data_dir, backend="json", rate_limits=False):
+    """Pointing the server at a temp copy of the data files"""
+    for name in ("menu.json", "clients.json", "orders.json"):
+        source = os.path.join("data", name)
+        if os.path.exists(source):
+            shutil.copy(source, os.path.join(data_dir, name))
+    main.MENU_FILE = os.path.join(data_dir, "menu.json")
+    main.USERS_FILE = os.path.join(data_dir, "clients.json")
+    main.ORDERS_FILE = os.path.join(data_dir, "orders.json")
+    main.DB_FILE = os.path.join(data_dir, "pizza.db")
+    if backend == "sqlite":
+        # Keep the import summary out of a JSON report written to stdout
+        with redirect_stdout(sys.stderr):
+            main.migrate_to_sqlite()
+    main.storage = main.open_storage(backend)
+    main.token_manager = TokenManager(config_dir=data_dir, data_dir=data_dir)
+    # Every benchmark client shares one address and would be throttled as one
+    main.set_rate_limiting(rate_limits)
+    return main.token_manager.generate_token()
+
+def client_loop(port, admin_token, count, errors):
+    """Sending a mix of menu reads and admin-checked deletes"""
+    for i in range(count):
+        conn = http.client.HTTPConnection("localhost", port, timeout=30)
+        try:
+            if i % 4 == 0:
+                conn.request("DELETE", "/menu/missing", headers={"Admin-Token": admin_token})
+            else:
+                conn.request("GET", "/menu")
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500 or response.status == 429:
+                errors.append(response.status)
+        except OSError as error:
+            errors.append(str(error))
+        finally:
+            conn.close()
+
+def run_load(workers, clients, requests_per_client, admin_token):
+    """Running one load round against a server with given worker count"""
+    server = main.create_server(port=0, workers=workers)
+    port = server.server_address[1]
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+
+    errors = []
+    threads = [
+        threading.Thread(target=client_loop, args=(port, admin_token, requests_per_client, errors))
+        for _ in range(clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    server.shutdown()
+    server.server_close()
+    total = clients * requests_per_client
+    return total / elapsed, len(errors)
+
+def add_benchmark_users(count):
+    """Registering users the mixed workload logs in as"""
+    users = []
+    for i in range(count):
+        name = f"bench{i}"
+        main.get_storage().add_user(name, {"password": main.hash_password("bench"), "street": f"Bench Street {i}"})
+        users.append(name)
+    return users
+
+def mixed_client(port, admin_token, user, count, seed, samples, errors):
+    """Sending a weighted mix of customer and admin calls over one keep-alive connection"""
+    rng = random.Random(seed)
+    calls = [call for call, _ in MIXED_WORKLOAD]
+    weights = [weight for _, weight in MIXED_WORKLOAD]
+    conn = http.client.HTTPConnection("localhost", port, timeout=30)
+    session_token = None
+    order_ids = []
+
+    def send(call, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as error:
+            conn.close()
+            errors.append((call, str(error)))
+            return None
+        samples.append((call, time.perf_counter() - start))
+        if response.status >= 500 or response.status == 429:
+            errors.append((call, response.status))
+        return json.loads(data) if response.status < 300 and data else None
+
+    for i in range(count):
+        call = "POST /login" if session_token is None else rng.choices(calls, weights)[0]
+        if call == "POST /login":
+            data = send(call, "POST", "/login", {"name": user, "password": "bench"})
+            session_token = data.get("session_token") if data else None
+        elif call == "GET /menu":
+            send(call, "GET", "/menu")
+        elif call == "POST /order":
+            data = send(call, "POST", "/order",
+                        {"items": [{"pizza_id": "1", "quantity": rng.randint(1, 3)}]},
+                        {"Session-Token": session_token})
+            if data and "order_id" in data:
+                order_ids.append(data["order_id"])
+        elif call == "GET /order/status":
+            order_id = rng.choice(order_ids) if order_ids else "missing"
+            send(call, "GET", f"/order/status?order_id={order_id}")
+        elif call == "GET /orders":
+            send(call, "GET", "/orders?limit=20", headers={"Admin-Token": admin_token})
+        else:
+            send(call, "DELETE", "/menu/missing", headers={"Admin-Token": admin_token})
+    conn.close()
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list"""
+    rank = max(0, -(-len(sorted_values) * percent // 100) - 1)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+def summarize(samples, errors, elapsed):
+    """Per-route count, throughput and latency percentiles in milliseconds"""
+    by_route = {}
+    for call, latency in samples:
+        by_route.setdefault(call, []).append(latency)
+    error_counts = {}
+    for call, _ in errors:
+        error_counts[call] = error_counts.get(call, 0) + 1
+
+    routes = {}
+    for call, latencies in sorted(by_route.items()):
+        latencies.sort()
+        route = {
+            "count": len(latencies),
+            "errors": error_counts.get(call, 0),
+            "throughput_rps": round(len(latencies) / elapsed, 1),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        }
+        for percent in PERCENTILES:
+            route[f"p{percent}_ms"] = round(percentile(latencies, percent) * 1000, 3)
+        routes[call] = route
+
+    all_latencies = sorted(latency for _, latency in samples)
+    total = {
+        "count": len(all_latencies),
+        "errors": len(errors),
+        "throughput_rps": round(len(all_latencies) / elapsed, 1),
+    }
+    for percent in PERCENTILES:
+        total[f"p{percent}_ms"] = round(percentile(all_latencies, percent) * 1000, 3) if all_latencies else None
+    return {"elapsed_s": round(elapsed, 3), "total": total, "routes": routes}
+
+def run_mixed(workers, clients, requests_per_client, admin_token, users, seed):
+    """Running the mixed workload against a server with given worker count"""
+    server = main.create_server(port=0, workers=workers)
+    port = server.server_address[1]
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+
+    samples = []
+    errors = []
+    threads = [
+        threading.Thread(target=mixed_client, args=(
+            port, admin_token, users[i % len(users)], requests_per_client, seed + i, samples, errors
+        ))
+        for i in range(clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    server.shutdown()
+    server.server_close()
+    result = {"workers": workers, "clients": clients, "requests_per_client": requests_per_client}
+    result.update(summarize(samples, errors, elapsed))
+    return result
+
+# Every wrong secret for a known id costs a full PBKDF2 run, keep that flood short
+MAX_HASHED_FLOOD = 200
+
+def run_token_flood(data_dir, attempts):
+    """
+    Measuring token validations per second under a flood of failed attempts,
+    with unknown token ids (rejected before hashing) and with a known id and a
+    wrong secret; returns {kind: (attempts, validations per second)}
+    """
+    manager = TokenManager(config_dir=data_dir, data_dir=data_dir)
+    token_id = manager.generate_token().partition(".")[0]
+    floods = {
+        "unknown id": (attempts, lambda i: f"unknown{i}.secret"),
+        "known id, wrong secret": (min(attempts, MAX_HASHED_FLOOD), lambda i: f"{token_id}.wrong{i}")
+    }
+    # Keep the floods from tripping the lockout so every attempt is counted
+    manager.config["max_failed_attempts"] = sum(count for count, _ in floods.values()) + 1
+
+    rates = {}
+    for kind, (count, make_token) in floods.items():
+        start = time.perf_counter()
+        for i in range(count):
+            manager.validate_token(make_token(i))
+        elapsed = time.perf_counter() - start
+        rates[kind] = (count, count / elapsed)
+    manager.flush()
+    return rates
+
+def main_benchmark():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Load test the pizza server")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="Worker counts to compare")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per client")
+    parser.add_argument("--token-flood", type=int, metavar="N",
+                        help="Instead of the load test, time N failed token validations")
+    parser.add_argument("--mixed", action="store_true",
+                        help="Run the mixed customer/admin workload and report per-route latency as JSON")
+    parser.add_argument("--storage", choices=["json", "sqlite"], default="json",
+                        help="Storage backend of the server under test")
+    parser.add_argument("--rate-limits", action="store_true",
+                        help="Keep the login and admin rate limiters on, all clients share one address")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed of the mixed workload")
+    parser.add_argument("--output", metavar="FILE", help="Write the JSON report to FILE instead of stdout")
+    args = parser.parse_args()
+
+    # Access log lines would dominate the run time
+    main.PizzaServer.log_message = lambda *args: None
+
+    if args.token_flood:
+        with tempfile.TemporaryDirectory() as data_dir:
+            rates = run_token_flood(data_dir, args.token_flood)
+        for kind, (count, rate) in rates.items():
+            print(f"{count} failed validations ({kind}): {rate:.1f} validations/s")
+        return
+
+    if args.mixed:
+        with tempfile.TemporaryDirectory() as data_dir:
+            admin_token = prepare_data_dir(data_dir, args.storage, args.rate_limits)
+            users = add_benchmark_users(args.clients)
+            report = {
+                "storage": args.storage,
+                "seed": args.seed,
+                "runs": [
+                    run_mixed(workers, args.clients, args.requests, admin_token, users, args.seed)
+                    for workers in args.workers
+                ]
+            }
+            main.storage.close()
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=4)
+        else:
+            print(json.dumps(report, indent=4))
+        return
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        admin_token = prepare_data_dir(data_dir, args.storage, args.rate_limits)
+        print(f"{'workers':>8} {'req/s':>10} {'errors':>7}")
+        for workers in args.workers:
+            rps, errors = run_load(workers, args.clients, args.requests, admin_token)
+            print(f"{workers:>8} {rps:>10.1f} {errors:>7}")
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,88 @@
+import os
+import json
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_BASE_URL = "http://localhost:8000"
+
+class PizzaClient:
+    """
+    Shared HTTP client for the pizza CLI.
+
+    All calls go through one requests.Session, so the connection to the server
+    is kept alive and reused by multi-step flows (whoami then order, status
+    then cancel). The session token saved by the last login is sent with every
+    request. The last menu is kept on disk with its ETag and only revalidated.
+    """
+    def __init__(self, base_url=None, session_file=None, menu_cache_file=None, timeout=10, pool_size=4):
+        self.base_url = (base_url or os.environ.get("PIZZA_API_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.session_file = session_file or os.path.expanduser("~/.pizza_session")
+        self.menu_cache_file = menu_cache_file or os.path.expanduser("~/.pizza_menu_cache.json")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        token = self._load_session_token()
+        if token:
+            self.session.headers["Session-Token"] = token
+
+    def _load_session_token(self):
+        if os.path.exists(self.session_file):
+            with open(self.session_file, "r") as f:
+                return f.read().strip() or None
+        return None
+
+    def set_session_token(self, token):
+        """Saving session token for next CLI runs, None logs out"""
+        if token is None:
+            self.session.headers.pop("Session-Token", None)
+            if os.path.exists(self.session_file):
+                os.remove(self.session_file)
+            return
+        self.session.headers["Session-Token"] = token
+        with open(self.session_file, "w") as f:
+            f.write(token)
+        os.chmod(self.session_file, 0o600)
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, self.base_url + path, **kwargs)
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+    def _load_menu_cache(self):
+        if os.path.exists(self.menu_cache_file):
+            try:
+                with open(self.menu_cache_file, "r") as f:
+                    return json.load(f)
+            except json.JSONDecodeError:
+                pass
+        return None
+
+    def get_menu(self):
+        """Menu from the server, revalidating the local copy with If-None-Match"""
+        cached = self._load_menu_cache()
+        headers = {"If-None-Match": cached["etag"]} if cached else {}
+        response = self.get("/menu", headers=headers)
+        if response.status_code == 304 and cached:
+            return cached["menu"]
+        if response.status_code != 200:
+            raise requests.RequestException("Server returned an error.")
+
+        menu = response.json()
+        etag = response.headers.get("ETag")
+        if etag:
+            with open(self.menu_cache_file, "w") as f:
+                json.dump({"etag": etag, "menu": menu}, f)
+        return menu
+
+    def close(self):
+        self.session.close()
@@ -1,46 +1,210 @@
 import os
+import csv
 import json
+import time
 import uuid
 import hashlib
+import gzip
+import zlib
+import base64
 import argparse
+import threading
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import parse_qs, urlparse
 from datetime import datetime, timedelta
 import requests
+try:
+    import brotli
+except ImportError:
+    brotli = None
+from http.cookies import SimpleCookie
 from security.TokenManager import TokenManager
+from security.SessionManager import SessionManager
+from security.RateLimiter import RateLimiter
+from security.HashingService import HashingService
+from client.PizzaClient import PizzaClient
+from storage.BaseStorage import DEFAULT_MENU
+from storage.JsonStorage import JsonStorage
+from storage.SqliteStorage import SqliteStorage
+from scheduling.OrderScheduler import OrderScheduler, derive_status
+from monitoring.Metrics import Metrics
+from monitoring.InstrumentedStorage import InstrumentedStorage
+from routing.Router import Router
 
 # File paths
 MENU_FILE = "data/menu.json"
 USERS_FILE = "data/clients.json"
 ORDERS_FILE = "data/orders.json"
+DB_FILE = "data/pizza.db"
+SESSIONS_FILE = "data/sessions.json"
+
+# Shared HTTP client of the CLI, see get_client()
+client = None
+
+# Password and token hashing pool, resized by run_server()
+hashing_service = HashingService()
 
 # Initialization of token manager
 token_manager = None
+token_manager_lock = threading.Lock()
+
+# Guards check-then-write steps when serving with several workers
+data_lock = threading.RLock()
+
+# Logged-in customers, replaced by run_server() when sessions are persisted
+session_manager = SessionManager()
+
+# Storage backend used by the server, see open_storage()
+storage = None
+
+# Moves orders through their statuses, started by run_server()
+order_scheduler = None
+
+# Serialized GET /menu body and its ETag, rebuilt when the menu version changes
+menu_response = {"version": None, "body": b"", "etag": ""}
+MENU_CACHE_CONTROL = "no-cache"
+
+# Responses smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+# Streamed responses are written in chunks of about this many bytes
+STREAM_CHUNK_SIZE = 16 * 1024
+EXPORT_PAGE_SIZE = 500
+
+# Login attempts and admin token checks are throttled per client address and
+# per user name before any password or token is hashed
+login_address_limiter = RateLimiter(rate=0.5, capacity=20)
+login_user_limiter = RateLimiter(rate=1 / 12, capacity=5)
+admin_address_limiter = RateLimiter(rate=5, capacity=30)
+RATE_LIMITERS = (login_address_limiter, login_user_limiter, admin_address_limiter)
+
+# Request, storage and token metrics served on GET /metrics
+metrics = Metrics()
+metrics.describe("pizza_http_requests_total", "counter", "HTTP requests by method, route and status code.")
+metrics.describe("pizza_http_request_duration_seconds", "histogram", "Time spent handling HTTP requests.")
+metrics.describe("pizza_storage_operation_duration_seconds", "histogram", "Time spent in storage calls.")
+metrics.describe("pizza_token_validation_duration_seconds", "histogram", "Time spent validating admin tokens.")
+metrics.describe("pizza_active_sessions", "gauge", "Open customer sessions.")
+metrics.gauge("pizza_active_sessions", lambda: len(session_manager))
+metrics.describe("pizza_hash_queue_depth", "gauge", "Password and token hashes waiting for a hashing worker.")
+metrics.gauge("pizza_hash_queue_depth", lambda: hashing_service.queue_depth)
 
 def get_token_manager():
     """
     Getting token manager
     """
     global token_manager
-    if token_manager is None:
-        token_manager = TokenManager()
+    with token_manager_lock:
+        if token_manager is None:
+            token_manager = TokenManager(hasher=hashing_service)
     return token_manager
 
+def set_rate_limiting(enabled):
+    """
+    Turning all request rate limiters on or off, e.g. for load tests from one address
+    """
+    for limiter in RATE_LIMITERS:
+        limiter.enabled = enabled
+
+def get_client(base_url=None):
+    """
+    Getting shared CLI client, keeping one pooled connection to the server
+    """
+    global client
+    if client is None:
+        client = PizzaClient(base_url)
+    return client
+
+def open_storage(backend="json"):
+    """
+    Opening storage backend
+    """
+    with metrics.time("pizza_storage_operation_duration_seconds", (("operation", "open"),)):
+        if backend == "sqlite":
+            store = SqliteStorage(DB_FILE)
+        else:
+            store = JsonStorage(MENU_FILE, USERS_FILE, ORDERS_FILE)
+    return InstrumentedStorage(store, metrics)
+
+def get_storage():
+    """
+    Getting storage, JSON files unless the server opened another backend
+    """
+    global storage
+    with data_lock:
+        if storage is None:
+            storage = open_storage()
+    return storage
+
+def validate_admin_token(token, scope, client):
+    """Validating admin token sent from client address, timing the check for /metrics"""
+    start = time.perf_counter()
+    is_valid, message = get_token_manager().validate_token(token, scope, client)
+    result = "valid" if is_valid else "invalid"
+    metrics.observe("pizza_token_validation_duration_seconds", (("result", result),),
+                    time.perf_counter() - start)
+    return is_valid, message
+
 def get_order_status(order):
     """Calculate the current status based on time"""
-    order_time = datetime.fromisoformat(order["order_time"])
-    delivery_time = datetime.fromisoformat(order["delivery_time"])
-    current_time = datetime.now()
-
-    if current_time >= delivery_time:
-        return "delivered"
-    elif current_time >= order_time + timedelta(minutes=5):
-        return "in delivery"
-    elif current_time >= order_time + timedelta(minutes=2):
-        return "preparing"
+    return derive_status(order)
+
+def get_menu_response(store):
+    """Getting serialized menu and ETag, must be called with data_lock held"""
+    version = store.menu_version()
+    if menu_response["version"] != version:
+        body = json.dumps(store.get_menu()).encode()
+        menu_response["body"] = body
+        menu_response["etag"] = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        menu_response["version"] = version
+    return menu_response["body"], menu_response["etag"]
+
+def build_order(menu, order_data, current_user):
+    """Validating order request against menu, returns (order, error)"""
+    if not isinstance(order_data, dict):
+        return None, "Order must be an object."
+
+    items = order_data.get("items", [])
+    if current_user:
+        address = current_user["street"]
     else:
-        return "pending"
+        address = order_data.get("address")
+        if not address:
+            return None, "Address is required for non-logged in users."
+        if not isinstance(address, str):
+            return None, "Address must be a string."
+
+    if not items:
+        return None, "Items are required."
+    if not isinstance(items, list):
+        return None, "Items must be a list."
+
+    validated_items = []
+    for item in items:
+        if not isinstance(item, dict):
+            return None, "Each item must be an object."
+        pizza_id = item.get("pizza_id")
+        quantity = item.get("quantity", 0)
+
+        if not isinstance(pizza_id, str) or pizza_id not in menu:
+            return None, f"Pizza ID {pizza_id} does not exist."
+        if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity <= 0:
+            return None, f"Invalid quantity {quantity} for pizza ID {pizza_id}."
+
+        validated_items.append({"pizza_id": pizza_id, "quantity": quantity})
+
+    order_time = datetime.now()
+    delivery_time = order_time + timedelta(minutes=30)
+
+    return {
+        "user": current_user["name"] if current_user else "Guest",
+        "items": validated_items,
+        "status": "pending",
+        "address": address,
+        "order_time": order_time.isoformat(),
+        "delivery_time": delivery_time.isoformat()
+    }, None
 
 def login_required(func):
     """
@@ -48,7 +212,7 @@ def login_required(func):
     """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        response = requests.get("http://localhost:8000/whoami")
+        response = get_client().get("/whoami")
         data = response.json()
         if "user" not in data:
             print("You need to be logged in first.")
@@ -67,287 +231,603 @@ def load_menu():
                 return json.load(f)
         except json.JSONDecodeError:
             print("Warning: Menu file is corrupted. Loading default menu.")
-    return {
-        "1": {"name": "Margherita", "price": 8.99},
-        "2": {"name": "Pepperoni", "price": 9.99},
-        "3": {"name": "Veggie", "price": 10.99}
-    }
-
-def load_users():
-    """Loading Users"""
-    os.makedirs(os.path.dirname(USERS_FILE), exist_ok=True)
-    if os.path.exists(USERS_FILE):
-        try:
-            with open(USERS_FILE, "r") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            print("Warning: Users file is corrupted. Creating new users file.")
-    return {}
+    return dict(DEFAULT_MENU)
 
-def load_orders():
-    """Loading orders"""
-    os.makedirs(os.path.dirname(ORDERS_FILE), exist_ok=True)
-    if os.path.exists(ORDERS_FILE):
-        try:
-            with open(ORDERS_FILE, "r") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            print("Warning: Orders file is corrupted. Creating new orders file.")
-    return {}
-
-def save_menu():
-    """Saving menu"""
-    os.makedirs(os.path.dirname(MENU_FILE), exist_ok=True)
-    with open(MENU_FILE, "w") as f:
-        json.dump(menu, f, indent=4)
-
-def save_users(users):
-    """Saving users"""
-    os.makedirs(os.path.dirname(USERS_FILE), exist_ok=True)
-    with open(USERS_FILE, "w") as f:
-        json.dump(users, f, indent=4)
-
-def save_orders(orders):
-    """Saving orders"""
-    os.makedirs(os.path.dirname(ORDERS_FILE), exist_ok=True)
-    with open(ORDERS_FILE, "w") as f:
-        json.dump(orders, f, indent=4)
+def migrate_to_sqlite():
+    """Importing data/*.json files into the SQLite database"""
+    source = JsonStorage(MENU_FILE, USERS_FILE, ORDERS_FILE)
+    target = SqliteStorage(DB_FILE)
+    try:
+        counts = target.import_json(source)
+    finally:
+        source.close()
+        target.close()
+    print(f"Imported {counts['menu']} pizzas, {counts['users']} users and "
+          f"{counts['orders']} orders into {DB_FILE}")
 
 def hash_password(password):
-    """Hashing password"""
-    return hashlib.sha256(password.encode()).hexdigest()
-
-menu = load_menu()
-users = load_users()
-orders = load_orders()
-current_user = None
+    """Hashing password on the hashing pool"""
+    return hashing_service.sha256(password.encode())
 
 class PizzaServer(BaseHTTPRequestHandler):
     """Class responsible for server side"""
-    def _send_response(self, status_code, data):
+    # HTTP/1.1 keeps client connections open between requests,
+    # idle ones are closed after timeout seconds
+    protocol_version = "HTTP/1.1"
+    timeout = 5
+    # Headers and body go out in separate writes, with Nagle's algorithm a
+    # kept-alive client waits for a delayed ACK before getting the body
+    disable_nagle_algorithm = True
+    # A single-threaded server serves one connection at a time, so an idle
+    # kept-alive client would block everyone else, see SingleConnectionPizzaServer
+    keep_alive = True
+
+    def handle_one_request(self):
+        # Timing covers parsing, routing and writing the response
+        self._status_code = None
+        self._route = None
+        start = time.perf_counter()
+        super().handle_one_request()
+        if self._status_code is None:
+            return
+        route = self._route.pattern if self._route is not None else "other"
+        metrics.increment("pizza_http_requests_total",
+                          (("method", self.command), ("route", route), ("status", self._status_code)))
+        metrics.observe("pizza_http_request_duration_seconds",
+                        (("method", self.command), ("route", route)), time.perf_counter() - start)
+
+    def send_response(self, code, message=None):
+        self._status_code = code
+        super().send_response(code, message)
+        # Rejected requests set close_connection before answering, their unread
+        # body would otherwise be taken for the client's next request
+        if not self.keep_alive or self.close_connection:
+            self.send_header("Connection", "close")
+
+    def _send_response(self, status_code, data, headers=None):
+        self._send_body(status_code, json.dumps(data).encode(), headers)
+
+    def _accepted_encoding(self):
+        """Best content coding the client accepts, None for identity"""
+        accepted = set()
+        for part in self.headers.get("Accept-Encoding", "").split(","):
+            coding, _, params = part.strip().partition(";")
+            if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+                continue
+            accepted.add(coding.strip().lower())
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def _send_body(self, status_code, body, headers=None, content_type="application/json"):
+        headers = dict(headers or {})
+        encoding = self._accepted_encoding() if len(body) >= MIN_COMPRESS_SIZE else None
+        if encoding == "br":
+            body = brotli.compress(body, quality=5)
+        elif encoding == "gzip":
+            body = gzip.compress(body, compresslevel=6)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            headers["Vary"] = "Accept-Encoding"
+
+        self.send_response(status_code)
+        self.send_header('Content-Type', content_type)
+        # A 304 has no body and must not announce one
+        if status_code != 304:
+            self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, status_code, pieces, headers=None):
+        """
+        Sending an iterable of byte strings with chunked transfer encoding,
+        compressing on the fly, so the whole body never sits in memory
+        """
+        encoding = self._accepted_encoding()
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=5)
+            compress, finish = compressor.process, compressor.finish
+        elif encoding == "gzip":
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+            compress, finish = compressor.compress, compressor.flush
+        else:
+            compress, finish = bytes, bytes
+
         self.send_response(status_code)
         self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+            self.send_header('Vary', 'Accept-Encoding')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
 
-    def _validate_admin(self):
-        """Validating Admin token"""
+        def write_chunk(data):
+            if data:
+                self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+        buffer = []
+        buffered = 0
+        for piece in pieces:
+            buffer.append(piece)
+            buffered += len(piece)
+            if buffered >= STREAM_CHUNK_SIZE:
+                write_chunk(compress(b"".join(buffer)))
+                buffer = []
+                buffered = 0
+        write_chunk(compress(b"".join(buffer)))
+        write_chunk(finish())
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _session_token(self):
+        """Session token from Session-Token header or session cookie"""
+        token = self.headers.get("Session-Token")
+        if token:
+            return token
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        return cookie["session"].value if "session" in cookie else None
+
+    def _current_user(self):
+        """User of the session this request belongs to, None for guests"""
+        return session_manager.get(self._session_token())
+
+    def _validate_admin(self, scope):
+        """Validating Admin token for given scope"""
         headers = self.headers
         token = headers.get("Admin-Token")
         if not token:
             self._send_response(401, {"error": "Admin token required"})
             return False
 
-        manager = get_token_manager()
-        is_valid, message = manager.validate_token(token)
+        is_valid, message = validate_admin_token(token, scope, self.client_address[0])
         if not is_valid:
             self._send_response(401, {"error": f"Unauthorized access. {message}"})
             return False
         return True
 
-    def do_GET(self):
-        """Do get"""
-        global menu, current_user, orders
-        menu = load_menu()
-        orders = load_orders()
-
-        if self.path == "/menu":
-            self._send_response(200, menu)
-        elif self.path.startswith("/order/status"):
-            query = parse_qs(urlparse(self.path).query)
-            order_id = query.get("order_id", [None])[0]
-            if not order_id or order_id not in orders:
-                self._send_response(404, {"error": "Order not found."})
-                return
+    def _dispatch(self):
+        """Routing the request, rejecting unknown routes and oversized bodies before reading"""
+        path = urlparse(self.path).path
+        route, params = router.match(self.command, path)
+        self._route = route
+        if route is None:
+            # The body of an unrouted request is never read, so the connection can't be reused
+            if self._has_body():
+                self.close_connection = True
+            allowed = router.allowed_methods(path)
+            if allowed:
+                self._send_response(405, {"error": "Method not allowed."}, {"Allow": ", ".join(allowed)})
+            else:
+                self._send_response(404, {"error": "Invalid endpoint."})
+            return
+        client_address = self.client_address[0]
+        if route.limiter is not None and not self._throttle(route.limiter, client_address):
+            return
+        if self.headers.get("Admin-Token") and not self._throttle(admin_address_limiter, client_address):
+            return
+        if not self._check_body(route):
+            return
 
-            # Update the order status based on current time
-            orders[order_id]["status"] = get_order_status(orders[order_id])
-            save_orders(orders)  # Save the updated status
+        route.handler(self, **params)
+        # Handlers that answer without needing the body (a rejected token)
+        # leave it unread, it is at most max_body bytes
+        if self._body_length:
+            self.rfile.read(self._body_length)
+            self._body_length = 0
+
+    do_GET = do_POST = do_DELETE = _dispatch
+
+    def _has_body(self):
+        return self.headers.get("Content-Length", "0") != "0" or bool(self.headers.get("Transfer-Encoding"))
+
+    def _throttle(self, limiter, key):
+        """Spending one request from key's bucket, sending 429 when it is empty"""
+        allowed, retry_after = limiter.allow(key)
+        if not allowed:
+            if self._has_body():
+                self.close_connection = True
+            self._send_response(429, {"error": "Too many requests. Try again later."},
+                                {"Retry-After": str(int(retry_after) + 1)})
+        return allowed
+
+    def _check_body(self, route):
+        """Checking the announced body size against the route limit, nothing is read yet"""
+        self._body = None
+        self._body_length = 0
+        if self.headers.get("Transfer-Encoding"):
+            self.close_connection = True
+            self._send_response(411, {"error": "Content-Length is required."})
+            return False
 
-            self._send_response(200, orders[order_id])
-        elif self.path == "/whoami":
-            if current_user is None:
-                self._send_response(200, {"message": "No user is currently logged in."})
-                return
+        length = self.headers.get("Content-Length")
+        if length is None:
+            return True
+        try:
+            length = int(length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            self._send_response(400, {"error": "Invalid Content-Length."})
+            return False
+        if length > route.max_body:
+            self.close_connection = True
+            self._send_response(413, {"error": f"Request body is limited to {route.max_body} bytes."})
+            return False
+        self._body_length = length
+        return True
 
+    def _json_body(self):
+        """Reading and decoding the body on first use, None after sending a 400"""
+        if self._body is None:
+            raw = self.rfile.read(self._body_length) if self._body_length else b""
+            self._body_length = 0
+            try:
+                self._body = json.loads(raw) if raw else {}
+            except (ValueError, UnicodeDecodeError):
+                self._body = False
+        if not isinstance(self._body, dict):
+            self._send_response(400, {"error": "Request body must be a JSON object."})
+            return None
+        return self._body
+
+    def _send_metrics(self):
+        """Sending metrics in Prometheus text format"""
+        self._send_body(200, metrics.render().encode(),
+                        content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    def _send_order_status(self):
+        """Sending order with its status derived on read"""
+        query = parse_qs(urlparse(self.path).query)
+        order_id = query.get("order_id", [None])[0]
+        with data_lock:
+            order = get_storage().get_order(order_id) if order_id else None
+        if order is None:
+            self._send_response(404, {"error": "Order not found."})
+        else:
+            # Status is derived on read, transitions are stored by the status updater
+            self._send_response(200, dict(order, status=get_order_status(order)))
+
+    def _send_cache_stats(self):
+        with data_lock:
+            stats = get_storage().stats()
+        self._send_response(200, stats)
+
+    def _send_whoami(self):
+        current_user = self._current_user()
+        if current_user is None:
+            self._send_response(200, {"message": "No user is currently logged in."})
+        else:
             self._send_response(200, {
                 "message": f"Logged in as {current_user['name']}",
                 "user": current_user
             })
-        else:
-            self._send_response(404, {"error": "Invalid endpoint."})
-
-    def do_POST(self):
-        """Do Post"""
-        global current_user, menu, users, orders
-        content_length = int(self.headers['Content-Length'])
-        post_data = json.loads(self.rfile.read(content_length))
 
-        if self.path == "/register":
-            name = post_data.get("name")
-            password = post_data.get("password")
-            street = post_data.get("street")
-
-            if not all([name, password, street]):
-                self._send_response(400, {"error": "Name, password, and street are required."})
-                return
+    def _send_kitchen_queue(self):
+        self._send_scheduler_view(kitchen=True)
 
-            if name in users:
-                self._send_response(409, {"error": "Username already exists."})
-                return
-
-            users[name] = {
-                "password": hash_password(password),
-                "street": street
-            }
-            save_users(users)
-            self._send_response(201, {"message": "User registered successfully."})
+    def _send_scheduler_view(self, kitchen=False):
+        """Sending kitchen queue or active orders grouped by status"""
+        if not self._validate_admin("orders"):
+            return
+        if order_scheduler is None:
+            self._send_response(503, {"error": "Order scheduler is not running."})
+        elif kitchen:
+            self._send_response(200, order_scheduler.kitchen_queue())
+        else:
+            self._send_response(200, order_scheduler.active_orders())
+
+    def _send_menu(self):
+        """Sending cached menu bytes, or an empty 304 when the client copy is current"""
+        with data_lock:
+            body, etag = get_menu_response(get_storage())
+        headers = {"ETag": etag, "Cache-Control": MENU_CACHE_CONTROL}
+
+        if_none_match = self.headers.get("If-None-Match", "")
+        client_etags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if etag in client_etags or "*" in client_etags:
+            self._send_body(304, b"", headers)
+        else:
+            self._send_body(200, body, headers)
 
-        elif self.path == "/login":
-            name = post_data.get("name")
-            password = post_data.get("password")
+    def _send_order_export(self):
+        self._send_order_listing(export=True)
 
-            if not all([name, password]):
-                self._send_response(400, {"error": "Name and password are required."})
-                return
+    def _send_order_listing(self, export=False):
+        """
+        Sending orders filtered by user, status, since, until and address,
+        one page of limit orders at a time, or all of them streamed for export
+        """
+        query = {name: values[0] for name, values in parse_qs(urlparse(self.path).query).items()}
+        user = query.get("user")
 
-            if name not in users or users[name]["password"] != hash_password(password):
-                self._send_response(401, {"error": "Invalid username or password."})
+        if self.headers.get("Admin-Token"):
+            if not self._validate_admin("orders"):
                 return
-
-            current_user = {
-                "name": name,
-                "street": users[name]["street"]
-            }
-
-            self._send_response(200, {
-                "message": "Login successful",
-                "street": users[name]["street"]
-            })
-
-        elif self.path == "/logout":
+        else:
+            # Customers only ever see their own orders
+            current_user = self._current_user()
             if current_user is None:
-                self._send_response(400, {"error": "No user is currently logged in."})
+                self._send_response(401, {"error": "Login or admin token required."})
                 return
+            user = current_user["name"]
 
-            logged_out_user = current_user["name"]
-            current_user = None
-            self._send_response(200, {"message": f"User {logged_out_user} logged out successfully."})
+        try:
+            since = datetime.fromisoformat(query["since"]).isoformat() if "since" in query else None
+            until = datetime.fromisoformat(query["until"]).isoformat() if "until" in query else None
+            limit = min(int(query.get("limit", 50)), 200)
+            after = json.loads(base64.urlsafe_b64decode(query["cursor"])) if "cursor" in query else None
+        except (ValueError, TypeError):
+            self._send_response(400, {"error": "Invalid since, until, limit or cursor."})
+            return
+        if limit <= 0:
+            self._send_response(400, {"error": "Limit must be positive."})
+            return
+        # A cursor is the [order_time, order_id] of the last order sent
+        if after is not None and not (
+                isinstance(after, list) and len(after) == 2 and all(isinstance(part, str) for part in after)):
+            self._send_response(400, {"error": "Invalid cursor."})
+            return
 
-        elif self.path == "/menu" and self._validate_admin():
-            name = post_data.get("name")
-            price = post_data.get("price")
+        filters = {
+            "user": user, "status": query.get("status"), "since": since,
+            "until": until, "address": query.get("address")
+        }
+        if export:
+            self._send_stream(200, self._export_pieces(filters, after))
+            return
 
-            if not name or not isinstance(price, (int, float)):
-                self._send_response(400, {"error": "Invalid pizza name or price."})
-                return
+        page = get_storage().query_orders(after=after, limit=limit, **filters)
+        next_cursor = None
+        if len(page) == limit:
+            order_id, order = page[-1]
+            next_cursor = base64.urlsafe_b64encode(
+                json.dumps([order["order_time"], order_id]).encode()
+            ).decode()
+        self._send_response(200, {
+            "orders": [
+                dict(order, order_id=order_id, status=get_order_status(order))
+                for order_id, order in page
+            ],
+            "next_cursor": next_cursor
+        })
+
+    def _export_pieces(self, filters, after):
+        """Serialized JSON of all matching orders, read from storage page by page"""
+        store = get_storage()
+        yield b'{"orders": ['
+        first = True
+        while True:
+            page = store.query_orders(after=after, limit=EXPORT_PAGE_SIZE, **filters)
+            for order_id, order in page:
+                piece = json.dumps(dict(order, order_id=order_id, status=get_order_status(order)))
+                yield (piece if first else ", " + piece).encode()
+                first = False
+            if len(page) < EXPORT_PAGE_SIZE:
+                break
+            order_id, order = page[-1]
+            after = (order["order_time"], order_id)
+        yield b"]}"
+
+    def _register(self):
+        post_data = self._json_body()
+        if post_data is None:
+            return
+        name = post_data.get("name")
+        password = post_data.get("password")
+        street = post_data.get("street")
 
-            pizza_id = str(len(menu) + 1)
-            menu[pizza_id] = {"name": name, "price": price}
-            save_menu()
-            self._send_response(201, {"message": f"Pizza '{name}' added successfully."})
+        if not all([name, password, street]):
+            self._send_response(400, {"error": "Name, password, and street are required."})
+            return
+        if not all(isinstance(value, str) for value in (name, password, street)):
+            self._send_response(400, {"error": "Name, password, and street must be strings."})
+            return
 
-        elif self.path == "/order":
-            items = post_data.get("items", [])
-            if current_user:
-                address = current_user["street"]
-            else:
-                address = post_data.get("address")
-                if not address:
-                    self._send_response(400, {"error": "Address is required for non-logged in users."})
-                    return
+        user = {
+            "password": hash_password(password),
+            "street": street
+        }
+        with data_lock:
+            added = get_storage().add_user(name, user)
+        if not added:
+            self._send_response(409, {"error": "Username already exists."})
+            return
+        self._send_response(201, {"message": "User registered successfully."})
 
-            if not items:
-                self._send_response(400, {"error": "Items are required."})
-                return
+    def _login(self):
+        post_data = self._json_body()
+        if post_data is None:
+            return
+        name = post_data.get("name")
+        password = post_data.get("password")
 
-            validated_items = []
-            for item in items:
-                pizza_id = item.get("pizza_id")
-                quantity = item.get("quantity", 0)
-
-                if pizza_id not in menu:
-                    self._send_response(400, {"error": f"Pizza ID {pizza_id} does not exist."})
-                    return
-                if quantity <= 0:
-                    self._send_response(400, {"error": f"Invalid quantity {quantity} for pizza ID {pizza_id}."})
-                    return
-
-                validated_items.append({"pizza_id": pizza_id, "quantity": quantity})
-
-            order_id = str(uuid.uuid4())
-            order_time = datetime.now()
-            delivery_time = order_time + timedelta(minutes=30)
-
-            orders[order_id] = {
-                "user": current_user["name"] if current_user else "Guest",
-                "items": validated_items,
-                "status": "pending",
-                "address": address,
-                "order_time": order_time.isoformat(),
-                "delivery_time": delivery_time.isoformat()
-            }
-            save_orders(orders)
-            self._send_response(201, {"order_id": order_id})
-
-    def do_DELETE(self):
-        """Do delete"""
-        if self.path.startswith("/menu/"):
-            if not self._validate_admin():
-                return
-            pizza_id = self.path.split("/")[-1]
-            if pizza_id in menu:
-                del menu[pizza_id]
-                save_menu()
-                self._send_response(200, {"message": "Pizza deleted successfully."})
-            else:
-                self._send_response(404, {"error": "Pizza not found."})
+        if not all([name, password]):
+            self._send_response(400, {"error": "Name and password are required."})
+            return
+        # The name keys the rate limiter, so a list or object can't go further
+        if not isinstance(name, str) or not isinstance(password, str):
+            self._send_response(400, {"error": "Name and password must be strings."})
+            return
+        if not self._throttle(login_user_limiter, name):
+            return
 
-        elif self.path.startswith("/order/"):
-            order_id = self.path.split("/")[-1]
+        with data_lock:
+            user = get_storage().get_user(name)
+        if user is None or user["password"] != hash_password(password):
+            self._send_response(401, {"error": "Invalid username or password."})
+            return
 
-            if order_id not in orders:
-                self._send_response(404, {"error": "Order not found"})
-                return
+        token = session_manager.create({
+            "name": name,
+            "street": user["street"]
+        })
+        self._send_response(200, {
+            "message": "Login successful",
+            "street": user["street"],
+            "session_token": token
+        }, {"Set-Cookie": f"session={token}; Path=/; HttpOnly; Max-Age={session_manager.ttl}"})
+
+    def _logout(self):
+        current_user = self._current_user()
+        if current_user is None:
+            self._send_response(400, {"error": "No user is currently logged in."})
+            return
 
-            # Get the order details
-            order = orders[order_id]
+        session_manager.delete(self._session_token())
+        self._send_response(200, {"message": f"User {current_user['name']} logged out successfully."},
+                            {"Set-Cookie": "session=; Path=/; Max-Age=0"})
 
-            # Check if order can still be cancelled (within 1 minute)
-            order_time = datetime.fromisoformat(order["order_time"])
-            time_elapsed = datetime.now() - order_time
-            if time_elapsed.total_seconds() > 60:  # 60 seconds = 1 minute
-                self._send_response(400, {"error": "Order cannot be cancelled after 1 minute"})
-                return
+    def _add_pizza(self):
+        # Token check runs PBKDF2, so it happens before the body is read or the lock taken
+        if not self._validate_admin("menu"):
+            return
+        post_data = self._json_body()
+        if post_data is None:
+            return
+        name = post_data.get("name")
+        price = post_data.get("price")
 
-            is_guest_order = order["user"] == "Guest"
-            is_user_order = current_user and order["user"] == current_user["name"]
+        if not name or not isinstance(price, (int, float)):
+            self._send_response(400, {"error": "Invalid pizza name or price."})
+            return
 
-            # Check if admin token is provided
-            headers = self.headers
-            token = headers.get("Admin-Token")
-            is_admin = False
-            if token:
-                manager = get_token_manager()
-                is_admin, _ = manager.validate_token(token)
+        with data_lock:
+            get_storage().add_pizza(name, price)
+        self._send_response(201, {"message": f"Pizza '{name}' added successfully."})
 
-            # Authorization check
-            if not (is_admin or is_guest_order or is_user_order):
-                self._send_response(403, {"error": "Unauthorized to cancel this order"})
-                return
+    def _create_order(self):
+        post_data = self._json_body()
+        if post_data is None:
+            return
+        current_user = self._current_user()
+        with data_lock:
+            store = get_storage()
+            order, error = build_order(store.get_menu(), post_data, current_user)
+            if error:
+                status_code, data = 400, {"error": error}
+            else:
+                order_id = str(uuid.uuid4())
+                store.add_order(order_id, order)
+                if order_scheduler is not None:
+                    order_scheduler.schedule(order_id, order)
+                status_code, data = 201, {"order_id": order_id}
+        self._send_response(status_code, data)
+
+    def _create_orders(self):
+        post_data = self._json_body()
+        if post_data is None:
+            return
+        batch = post_data.get("orders")
+        if not isinstance(batch, list) or not batch:
+            self._send_response(400, {"error": "A non-empty list of orders is required."})
+            return
 
-            del orders[order_id]
-            save_orders(orders)
-            self._send_response(200, {"message": "Order cancelled successfully"})
+        current_user = self._current_user()
+        with data_lock:
+            # One menu read for the whole batch and one storage write for all valid orders
+            store = get_storage()
+            menu = store.get_menu()
+            results = []
+            new_orders = {}
+            for order_data in batch:
+                order, error = build_order(menu, order_data, current_user)
+                if error:
+                    results.append({"error": error})
+                    continue
+                order_id = str(uuid.uuid4())
+                new_orders[order_id] = order
+                results.append({"order_id": order_id})
+
+            if new_orders:
+                store.add_orders(new_orders)
+                if order_scheduler is not None:
+                    for order_id, order in new_orders.items():
+                        order_scheduler.schedule(order_id, order)
+        self._send_response(201 if new_orders else 400, {
+            "created": len(new_orders),
+            "failed": len(batch) - len(new_orders),
+            "results": results
+        })
+
+    def _delete_pizza(self, pizza_id):
+        if not self._validate_admin("menu"):
+            return
+        with data_lock:
+            if get_storage().delete_pizza(pizza_id):
+                status_code, data = 200, {"message": "Pizza deleted successfully."}
+            else:
+                status_code, data = 404, {"error": "Pizza not found."}
+        self._send_response(status_code, data)
+
+    def _delete_order(self, order_id):
+        # Check if admin token is provided
+        token = self.headers.get("Admin-Token")
+        is_admin = False
+        if token:
+            is_admin, _ = validate_admin_token(token, "orders", self.client_address[0])
+
+        current_user = self._current_user()
+        with data_lock:
+            status_code, data = self._cancel_order(get_storage(), order_id, is_admin, current_user)
+        self._send_response(status_code, data)
+
+    def _cancel_order(self, store, order_id, is_admin, current_user):
+        """Cancelling order, must be called with data_lock held"""
+        order = store.get_order(order_id)
+        if order is None:
+            return 404, {"error": "Order not found"}
+
+        # Check if order can still be cancelled (within 1 minute)
+        order_time = datetime.fromisoformat(order["order_time"])
+        time_elapsed = datetime.now() - order_time
+        if time_elapsed.total_seconds() > 60:  # 60 seconds = 1 minute
+            return 400, {"error": "Order cannot be cancelled after 1 minute"}
+
+        is_guest_order = order["user"] == "Guest"
+        is_user_order = current_user and order["user"] == current_user["name"]
+
+        # Authorization check
+        if not (is_admin or is_guest_order or is_user_order):
+            return 403, {"error": "Unauthorized to cancel this order"}
+
+        store.delete_order(order_id)
+        if order_scheduler is not None:
+            order_scheduler.cancel(order_id)
+        return 200, {"message": "Order cancelled successfully"}
+
+# Bodies are JSON objects of a few fields, batches hold up to a few thousand orders
+MAX_BODY_SIZE = 16 * 1024
+MAX_BATCH_BODY_SIZE = 2 * 1024 * 1024
+
+router = Router()
+router.add("GET", "/menu", PizzaServer._send_menu)
+router.add("GET", "/metrics", PizzaServer._send_metrics)
+router.add("GET", "/kitchen", PizzaServer._send_kitchen_queue)
+router.add("GET", "/orders/active", PizzaServer._send_scheduler_view)
+router.add("GET", "/orders", PizzaServer._send_order_listing)
+router.add("GET", "/orders/export", PizzaServer._send_order_export)
+router.add("GET", "/order/status", PizzaServer._send_order_status)
+router.add("GET", "/cache/stats", PizzaServer._send_cache_stats)
+router.add("GET", "/whoami", PizzaServer._send_whoami)
+router.add("POST", "/register", PizzaServer._register, MAX_BODY_SIZE)
+router.add("POST", "/login", PizzaServer._login, MAX_BODY_SIZE, login_address_limiter)
+router.add("POST", "/logout", PizzaServer._logout, MAX_BODY_SIZE)
+router.add("POST", "/menu", PizzaServer._add_pizza, MAX_BODY_SIZE)
+router.add("POST", "/order", PizzaServer._create_order, MAX_BODY_SIZE)
+router.add("POST", "/orders/batch", PizzaServer._create_orders, MAX_BATCH_BODY_SIZE)
+router.add("DELETE", "/menu/{pizza_id}", PizzaServer._delete_pizza)
+router.add("DELETE", "/order/{order_id}", PizzaServer._delete_order)
 
 def list_menu():
     """Listing menu"""
     try:
-        response = requests.get("http://localhost:8000/menu",timeout=10)
-        if response.status_code == 200:
-            menu_data = response.json()
-        else:
-            raise requests.RequestException("Server returned an error.")
+        menu_data = get_client().get_menu()
     except requests.RequestException:
         print("Server not available. Loading menu from local file.")
         menu_data = load_menu()
@@ -372,7 +852,7 @@ def create_order():
             print("Invalid quantity. Try again.")
 
     # Check if user is logged in
-    whoami = requests.get("http://localhost:8000/whoami",timeout=10)
+    whoami = get_client().get("/whoami")
     data = whoami.json()
 
     if "user" not in data:
@@ -381,17 +861,106 @@ def create_order():
     else:
         order_data = {"items": order_items}
 
-    response = requests.post("http://localhost:8000/order", json=order_data,timeout=10)
+    response = get_client().post("/order", json=order_data)
 
     if response.status_code == 201:
         print(f"Order created successfully! Order ID: {response.json()['order_id']}")
     else:
         print("Failed to create order.", response.json())
 
+def read_order_file(path):
+    """
+    Reading orders from a JSON Lines file, or a CSV file with address and
+    items columns where items look like "1:2;3:1" (pizza_id:quantity).
+    Yields (line number, order, error) with order None for a malformed line.
+    """
+    if path.endswith(".csv"):
+        with open(path, "r", newline="") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                if row.get("address") is None or row.get("items") is None:
+                    yield reader.line_num, None, "Missing address or items column."
+                    continue
+                items = []
+                for entry in row["items"].split(";"):
+                    pizza_id, _, quantity = entry.strip().partition(":")
+                    quantity = quantity.strip() or "1"
+                    items.append({
+                        "pizza_id": pizza_id,
+                        "quantity": int(quantity) if quantity.isdigit() else quantity
+                    })
+                yield reader.line_num, {"address": row["address"], "items": items}, None
+    else:
+        with open(path, "r") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line), None
+                except ValueError as e:
+                    yield line_number, None, f"Invalid JSON: {e}"
+
+def import_orders(path, batch_size=500):
+    """Importing orders from file through the batch endpoint"""
+    print(f"\n--- Importing orders from {path} ---")
+    created = failed = 0
+    start = time.perf_counter()
+
+    def send(batch):
+        line_numbers = [line_number for line_number, _ in batch]
+        response = get_client().post("/orders/batch", json={"orders": [order for _, order in batch]})
+        data = response.json()
+        if "results" not in data:
+            print(f"Batch starting at line {line_numbers[0]} failed:", data.get("error"))
+            return 0, len(batch)
+        for line_number, result in zip(line_numbers, data["results"]):
+            if "error" in result:
+                print(f"Line {line_number}: {result['error']}")
+        return data["created"], data["failed"]
+
+    batch = []
+    for line_number, order_data, error in read_order_file(path):
+        if error:
+            print(f"Line {line_number}: {error}")
+            failed += 1
+            continue
+        batch.append((line_number, order_data))
+        if len(batch) >= batch_size:
+            batch_created, batch_failed = send(batch)
+            created += batch_created
+            failed += batch_failed
+            batch = []
+    if batch:
+        batch_created, batch_failed = send(batch)
+        created += batch_created
+        failed += batch_failed
+
+    elapsed = time.perf_counter() - start
+    rate = (created + failed) / elapsed if elapsed else 0
+    print(f"Created {created} orders, {failed} failed, {rate:.1f} orders/sec")
+
+@login_required
+def order_history():
+    """Listing orders of logged in user, page by page"""
+    print("\n--- Your Orders ---")
+    params = {"limit": 20}
+    while True:
+        response = get_client().get("/orders", params=params)
+        if response.status_code != 200:
+            print("Failed to fetch orders.", response.json().get("error"))
+            return
+        data = response.json()
+        for order in data["orders"]:
+            items = ", ".join(f"{item['quantity']} x {item['pizza_id']}" for item in order["items"])
+            print(f"{order['order_time']}  {order['order_id']}  {order['status'].upper()}  {items}")
+        if not data["next_cursor"] or input("Show more? (y/n): ").strip().lower() != "y":
+            return
+        params["cursor"] = data["next_cursor"]
+
 def check_order_status():
     """Checking order status"""
     order_id = input("Enter order ID to check status: ")
-    response = requests.get(f"http://localhost:8000/order/status?order_id={order_id}",timeout=10)
+    response = get_client().get("/order/status", params={"order_id": order_id})
     if response.status_code == 200:
         order = response.json()
         order_time = datetime.fromisoformat(order["order_time"])
@@ -422,7 +991,7 @@ def cancel_order():
     order_id = input("Enter order ID to cancel: ")
 
     try:
-        status_response = requests.get(f"http://localhost:8000/order/status?order_id={order_id}",timeout=10)
+        status_response = get_client().get("/order/status", params={"order_id": order_id})
         if status_response.status_code != 200:
             print("Order not found.")
             return
@@ -437,7 +1006,7 @@ def cancel_order():
             print(f"This order was placed {int(time_elapsed.total_seconds())} seconds ago.")
             return
 
-        response = requests.delete(f"http://localhost:8000/order/{order_id}",timeout=10)
+        response = get_client().delete(f"/order/{order_id}")
 
         try:
             response_data = response.json()
@@ -469,8 +1038,8 @@ def register_user():
     password = input("Enter password: ").strip()
     street = input("Enter street address: ").strip()
 
-    response = requests.post("http://localhost:8000/register",
-                           json={"name": name, "password": password, "street": street},timeout=10)
+    response = get_client().post("/register",
+                                 json={"name": name, "password": password, "street": street})
 
     if response.status_code == 201:
         print("Registration successful!")
@@ -483,12 +1052,12 @@ def login_user():
     name = input("Enter username: ").strip()
     password = input("Enter password: ").strip()
 
-    response = requests.post("http://localhost:8000/login",
-                           json={"name": name, "password": password},timeout=10)
+    response = get_client().post("/login", json={"name": name, "password": password})
 
     if response.status_code == 200:
         print("Login successful!")
         data = response.json()
+        get_client().set_session_token(data["session_token"])
         print(f"Welcome back! Your delivery address is: {data['street']}")
         return True
     else:
@@ -498,8 +1067,9 @@ def login_user():
 def logout_user():
     """Logout user"""
     try:
-        response = requests.post("http://localhost:8000/logout", json={},timeout=10)
+        response = get_client().post("/logout", json={})
         if response.status_code == 200:
+            get_client().set_session_token(None)
             print(response.json()["message"])
         else:
             print("Logout failed:", response.json().get("error"))
@@ -510,7 +1080,7 @@ def logout_user():
 
 def check_current_user():
     """Checking current user"""
-    response = requests.get("http://localhost:8000/whoami",timeout=10)
+    response = get_client().get("/whoami")
     data = response.json()
     print(data["message"])
     if "user" in data:
@@ -520,7 +1090,7 @@ def admin_panel():
     """Admin Panel"""
     print("\n--- Generate New Admin Token ---")
     manager = get_token_manager()
-    token = manager.generate_token()
+    token = manager.generate_token(name="cli-admin")
     print(f"Your new admin token is: {token}")
     print("Please save this token securely. It will expire in 24 hours.")
 
@@ -530,17 +1100,19 @@ def admin_panel():
         print("2. Delete Pizza from Menu")
         print("3. Cancel Any Order")
         print("4. Generate New Admin Token")
-        print("5. Quit Admin Panel")
+        print("5. List Admin Tokens")
+        print("6. Revoke Admin Token")
+        print("7. Quit Admin Panel")
         choice = input("Select an option: ").strip()
 
         if choice == "1":
             pizza_name = input("Enter pizza name: ").strip()
             try:
                 pizza_price = float(input("Enter pizza price: "))
-                response = requests.post(
-                    "http://localhost:8000/menu",
+                response = get_client().post(
+                    "/menu",
                     json={"name": pizza_name, "price": pizza_price},
-                    headers={"Admin-Token": token},timeout=10
+                    headers={"Admin-Token": token}
                 )
                 if response.status_code == 201:
                     print(response.json()["message"])
@@ -551,9 +1123,9 @@ def admin_panel():
 
         elif choice == "2":
             pizza_id = input("Enter the ID of the pizza to delete: ").strip()
-            response = requests.delete(
-                f"http://localhost:8000/menu/{pizza_id}",
-                headers={"Admin-Token": token},timeout=10
+            response = get_client().delete(
+                f"/menu/{pizza_id}",
+                headers={"Admin-Token": token}
             )
             if response.status_code == 200:
                 print(response.json()["message"])
@@ -562,9 +1134,9 @@ def admin_panel():
 
         elif choice == "3":
             order_id = input("Enter the ID of the order to cancel: ").strip()
-            response = requests.delete(
-                f"http://localhost:8000/order/{order_id}",
-                headers={"Admin-Token": token},timeout=10
+            response = get_client().delete(
+                f"/order/{order_id}",
+                headers={"Admin-Token": token}
             )
             if response.status_code == 200:
                 print(response.json()["message"])
@@ -572,11 +1144,23 @@ def admin_panel():
                 print(response.json()["error"])
 
         elif choice == "4":
-            token = manager.generate_token()
+            token = manager.generate_token(name="cli-admin")
             print(f"Your new admin token is: {token}")
             print("Please save this token securely. It will expire in 24 hours.")
 
         elif choice == "5":
+            for token_id, entry in manager.list_tokens().items():
+                print(f"{token_id}: {entry['name']}, scopes: {', '.join(entry['scopes'])}, "
+                      f"expires: {entry['expiry']}")
+
+        elif choice == "6":
+            token_id = input("Enter the ID of the token to revoke: ").strip()
+            if manager.revoke_token(token_id):
+                print(f"Token {token_id} revoked.")
+            else:
+                print("Token not found.")
+
+        elif choice == "7":
             print("Exiting Admin Panel.")
             break
         else:
@@ -598,10 +1182,14 @@ def cli_interface(args):
         create_order()
     elif args.status:
         check_order_status()
+    elif args.history:
+        order_history()
     elif args.cancel:
         cancel_order()
     elif args.admin:
         admin_panel()
+    elif args.import_file:
+        import_orders(args.import_file, args.batch_size)
     elif args.commands:
         print("\n--- Commands ---")
         print("--register: Register a new user account")
@@ -612,15 +1200,64 @@ def cli_interface(args):
         print("--create: Create a new order")
         print("--status: Check the status of an order")
         print("--cancel: Cancel an order")
+        print("--history: List your orders")
         print("--server: Run the HTTP server")
+        print("--url URL: Talk to the server at URL instead of http://localhost:8000")
+        print("--workers N: Serve requests with N worker threads (with --server)")
+        print("--storage json|sqlite: Choose the server storage backend (with --server)")
+        print("--hash-workers N: Hash passwords and tokens on N threads (with --server)")
+        print("--persist-sessions: Keep login sessions across server restarts (with --server)")
+        print("--migrate: Import data/*.json files into the SQLite database")
         print("--admin: Access the admin panel")
+        print("--import FILE: Create orders from a JSON Lines or CSV file in batches")
     else:
         print("Invalid option. Use --commands to see available commands.")
 
-def run_server():
+class SingleConnectionPizzaServer(PizzaServer):
+    """Handler closing every connection after its response, for the single-threaded server"""
+    keep_alive = False
+
+class PooledHTTPServer(HTTPServer):
+    """HTTP server handing every connection to a fixed pool of worker threads"""
+    def __init__(self, server_address, handler_class, workers=8):
+        super().__init__(server_address, handler_class)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pizza-worker")
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+def create_server(host="localhost", port=8000, workers=1):
+    """Creating server, single-threaded for one worker and pooled otherwise"""
+    if workers > 1:
+        return PooledHTTPServer((host, port), PizzaServer, workers=workers)
+    return HTTPServer((host, port), SingleConnectionPizzaServer)
+
+def run_server(workers=1, backend="json", persist_sessions=False, hash_workers=None):
     """Running server"""
-    server = HTTPServer(('localhost', 8000), PizzaServer)
-    print("Server running on port 8000...")
+    global storage, order_scheduler, session_manager, hashing_service
+    if hash_workers:
+        hashing_service = HashingService(hash_workers)
+    storage = open_storage(backend)
+    get_token_manager().start_sweeper()
+    if persist_sessions:
+        session_manager = SessionManager(persist_file=SESSIONS_FILE)
+    order_scheduler = OrderScheduler(storage)
+    order_scheduler.load()
+    order_scheduler.start()
+    server = create_server(workers=workers)
+    print(f"Server running on port 8000 with {workers} worker(s) and {backend} storage...")
     server.serve_forever()
 
 def main():
@@ -634,14 +1271,34 @@ def main():
     parser.add_argument("--create", action="store_true", help="Create a new order")
     parser.add_argument("--status", action="store_true", help="Check the status of an order")
     parser.add_argument("--cancel", action="store_true", help="Cancel an order")
+    parser.add_argument("--history", action="store_true", help="List your orders")
     parser.add_argument("--server", action="store_true", help="Run the HTTP server")
     parser.add_argument("--admin", action="store_true", help="Access the admin panel")
     parser.add_argument("--commands", action="store_true", help="Show all available commands")
+    parser.add_argument("--import", dest="import_file", metavar="FILE",
+                        help="Create orders from a JSON Lines or CSV file")
+    parser.add_argument("--batch-size", type=int, default=500,
+                        help="Orders sent per request with --import")
+    parser.add_argument("--url", help="Server base URL used by the CLI (default http://localhost:8000)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of server worker threads (1 = single-threaded)")
+    parser.add_argument("--storage", choices=["json", "sqlite"], default="json",
+                        help="Storage backend used by the server")
+    parser.add_argument("--hash-workers", type=int,
+                        help="Threads hashing passwords and tokens (default: one per CPU)")
+    parser.add_argument("--persist-sessions", action="store_true",
+                        help="Keep login sessions in data/sessions.json across server restarts")
+    parser.add_argument("--migrate", action="store_true",
+                        help="Import data/*.json files into the SQLite database")
 
     args = parser.parse_args()
+    get_client(args.url)
 
     if args.server:
-        run_server()
+        run_server(workers=args.workers, backend=args.storage, persist_sessions=args.persist_sessions,
+                   hash_workers=args.hash_workers)
+    elif args.migrate:
+        migrate_to_sqlite()
     else:
         cli_interface(args)
 
@@ -0,0 +1,19 @@
+class InstrumentedStorage:
+    """
+    Wraps a storage backend and times every method call into a metrics histogram
+    labelled with the method name.
+    """
+    def __init__(self, store, metrics, name="pizza_storage_operation_duration_seconds"):
+        self._store = store
+        self._metrics = metrics
+        self._name = name
+
+    def __getattr__(self, attribute):
+        value = getattr(self._store, attribute)
+        if not callable(value):
+            return value
+
+        def timed(*args, **kwargs):
+            with self._metrics.time(self._name, (("operation", attribute),)):
+                return value(*args, **kwargs)
+        return timed
@@ -0,0 +1,115 @@
+import time
+import threading
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class Metrics:
+    """
+    Counters and latency histograms exposed in Prometheus text format.
+
+    Every thread records into its own shard, so recording takes no lock and
+    threads never contend. render() merges the shards when /metrics is scraped.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._help = {}
+        self._types = {}
+        self._gauges = {}
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def describe(self, name, metric_type, help_text):
+        self._types[name] = metric_type
+        self._help[name] = help_text
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {"counters": {}, "histograms": {}}
+            self._local.shard = shard
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def increment(self, name, labels=(), amount=1):
+        counters = self._shard()["counters"]
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        histograms = self._shard()["histograms"]
+        key = (name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [[0] * len(self.buckets), 0, 0.0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                histogram[0][index] += 1
+                break
+        histogram[1] += 1
+        histogram[2] += value
+
+    @contextmanager
+    def time(self, name, labels=()):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, labels, time.perf_counter() - start)
+
+    def gauge(self, name, callback):
+        """Registering a gauge whose value is read from callback at scrape time"""
+        self._gauges[name] = callback
+
+    @staticmethod
+    def _format_labels(labels, extra=()):
+        pairs = tuple(labels) + tuple(extra)
+        if not pairs:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+        return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+    def render(self):
+        counters = {}
+        histograms = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, value in list(shard["counters"].items()):
+                counters[key] = counters.get(key, 0) + value
+            for key, (bucket_counts, count, total) in list(shard["histograms"].items()):
+                merged = histograms.setdefault(key, [[0] * len(self.buckets), 0, 0.0])
+                merged[0] = [a + b for a, b in zip(merged[0], bucket_counts)]
+                merged[1] += count
+                merged[2] += total
+
+        lines = []
+        described = set()
+
+        def header(name):
+            if name not in described and name in self._types:
+                lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {self._types[name]}")
+            described.add(name)
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name)
+            lines.append(f"{name}{self._format_labels(labels)} {value}")
+
+        for (name, labels), (bucket_counts, count, total) in sorted(histograms.items()):
+            header(name)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{self._format_labels(labels, (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_bucket{self._format_labels(labels, (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {total}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {count}")
+
+        for name, callback in sorted(self._gauges.items()):
+            header(name)
+            lines.append(f"{name} {callback()}")
+
+        return "\n".join(lines) + "\n"
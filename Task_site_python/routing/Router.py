@@ -0,0 +1,64 @@
+from collections import namedtuple
+
+Route = namedtuple("Route", "method pattern handler max_body limiter")
+
+class Router:
+    """
+    Maps request method and path to a handler.
+
+    Static paths are looked up in a dict. Paths with {name} segments are split
+    into segment tuples once, when added, and only candidates with the same
+    number of segments are compared, so matching never scans every route or
+    runs a regex. Each route carries the largest request body it accepts and
+    optionally a rate limiter checked before the request is handled.
+    """
+    def __init__(self):
+        self._static = {}
+        self._dynamic = {}
+
+    def add(self, method, pattern, handler, max_body=0, limiter=None):
+        route = Route(method, pattern, handler, max_body, limiter)
+        if "{" not in pattern:
+            self._static.setdefault(pattern, {})[method] = route
+            return route
+
+        segments = tuple(pattern.strip("/").split("/"))
+        candidates = self._dynamic.setdefault(len(segments), [])
+        for existing, methods in candidates:
+            if existing == segments:
+                methods[method] = route
+                break
+        else:
+            candidates.append((segments, {method: route}))
+        return route
+
+    def _lookup(self, path):
+        methods = self._static.get(path)
+        if methods is not None:
+            return methods, {}
+
+        parts = path.strip("/").split("/")
+        for segments, methods in self._dynamic.get(len(parts), ()):
+            params = {}
+            for segment, part in zip(segments, parts):
+                if segment[0] == "{":
+                    if not part:
+                        break
+                    params[segment[1:-1]] = part
+                elif segment != part:
+                    break
+            else:
+                return methods, params
+        return None, None
+
+    def match(self, method, path):
+        """Route and path parameters for the request, route is None when nothing matches"""
+        methods, params = self._lookup(path)
+        if methods is None or method not in methods:
+            return None, None
+        return methods[method], params
+
+    def allowed_methods(self, path):
+        """Methods the path is routed for, empty when the path is unknown"""
+        methods, _ = self._lookup(path)
+        return sorted(methods) if methods else []
@@ -0,0 +1,133 @@
+import heapq
+import threading
+from datetime import datetime, timedelta
+
+# Minutes after order_time at which an order enters each status,
+# it becomes delivered at its own delivery_time
+STATUS_OFFSETS = [
+    ("preparing", timedelta(minutes=2)),
+    ("in delivery", timedelta(minutes=5))
+]
+STATUS_ORDER = ["pending", "preparing", "in delivery", "delivered"]
+KITCHEN_STATUSES = ("pending", "preparing")
+
+def status_schedule(order):
+    """List of (time, status) transitions of an order, in time order"""
+    order_time = datetime.fromisoformat(order["order_time"])
+    delivery_time = datetime.fromisoformat(order["delivery_time"])
+    schedule = [(order_time + offset, status) for status, offset in STATUS_OFFSETS]
+    schedule.append((delivery_time, "delivered"))
+    return schedule
+
+def derive_status(order, now=None):
+    """Status an order should have at the given time"""
+    now = now or datetime.now()
+    status = "pending"
+    for transition_time, next_status in status_schedule(order):
+        if now >= transition_time:
+            status = next_status
+    return status
+
+class OrderScheduler:
+    """
+    Moves orders through their statuses when their deadlines pass.
+
+    Pending transitions sit in a heap keyed by deadline. A background thread
+    sleeps until the earliest one, pops every transition that is due and stores
+    them with a single update_order_statuses() call. Orders that are not
+    delivered yet are also kept grouped by status, so the active-order and
+    kitchen views never scan the whole order history.
+    """
+    def __init__(self, store):
+        self.store = store
+        self._heap = []
+        self._orders = {}
+        self._statuses = {}
+        self._by_status = {"pending": {}, "preparing": {}, "in delivery": {}}
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def load(self):
+        """Scheduling every order from the store that is not delivered yet"""
+        for order_id, order in self.store.active_orders().items():
+            self.schedule(order_id, order)
+        self.advance()
+
+    def _set_status(self, order_id, status):
+        previous = self._statuses.get(order_id)
+        if previous in self._by_status:
+            del self._by_status[previous][order_id]
+        if status in self._by_status:
+            self._statuses[order_id] = status
+            self._by_status[status][order_id] = self._orders[order_id]
+        else:
+            del self._orders[order_id]
+            del self._statuses[order_id]
+
+    def schedule(self, order_id, order):
+        with self._condition:
+            self._orders[order_id] = order
+            self._set_status(order_id, order["status"])
+            current = STATUS_ORDER.index(order["status"])
+            for transition_time, status in status_schedule(order):
+                if STATUS_ORDER.index(status) > current:
+                    heapq.heappush(self._heap, (transition_time.timestamp(), order_id, status))
+            self._condition.notify()
+
+    def cancel(self, order_id):
+        # Heap entries of a cancelled order are skipped when they come due
+        with self._condition:
+            if order_id in self._orders:
+                self._set_status(order_id, "cancelled")
+
+    def advance(self, now=None):
+        """Applying every transition that is due, returns {order_id: status} of the batch"""
+        now = (now or datetime.now()).timestamp()
+        updates = {}
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                _, order_id, status = heapq.heappop(self._heap)
+                current = updates.get(order_id, self._statuses.get(order_id))
+                if current is None or STATUS_ORDER.index(status) <= STATUS_ORDER.index(current):
+                    continue
+                updates[order_id] = status
+            if updates:
+                self.store.update_order_statuses(updates)
+                for order_id, status in updates.items():
+                    self._set_status(order_id, status)
+        return updates
+
+    def _run(self):
+        with self._condition:
+            while not self._stopped:
+                timeout = self._heap[0][0] - datetime.now().timestamp() if self._heap else None
+                if timeout is None or timeout > 0:
+                    self._condition.wait(timeout)
+                    continue
+                self.advance()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="order-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def active_orders(self):
+        with self._condition:
+            return {status: list(orders) for status, orders in self._by_status.items()}
+
+    def kitchen_queue(self):
+        with self._condition:
+            return {
+                status: [
+                    {"order_id": order_id, "items": order["items"], "order_time": order["order_time"]}
+                    for order_id, order in self._by_status[status].items()
+                ]
+                for status in KITCHEN_STATUSES
+            }
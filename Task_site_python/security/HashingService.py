@@ -0,0 +1,50 @@
+import os
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+def _sha256_hex(data):
+    return hashlib.sha256(data).hexdigest()
+
+def _pbkdf2_hex(hash_name, data, salt, iterations):
+    return hashlib.pbkdf2_hmac(hash_name, data, salt, iterations).hex()
+
+class HashingService:
+    """
+    Password and token hashing on a fixed pool of worker threads.
+
+    hashlib releases the GIL while it hashes, so with a thread pool logins,
+    registrations and admin token checks hash in parallel on all cores while
+    the serving threads wait without holding the interpreter. The pool size
+    also caps how much CPU a burst of logins can take. queue_depth counts
+    hashes waiting for a free worker.
+    """
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hasher")
+        self._queued = 0
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self):
+        return self._queued
+
+    def _run(self, func, *args):
+        with self._lock:
+            self._queued += 1
+
+        def task():
+            with self._lock:
+                self._queued -= 1
+            return func(*args)
+
+        return self._executor.submit(task).result()
+
+    def sha256(self, data):
+        return self._run(_sha256_hex, data)
+
+    def pbkdf2(self, data, salt, iterations, hash_name="sha256"):
+        return self._run(_pbkdf2_hex, hash_name, data, salt, iterations)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
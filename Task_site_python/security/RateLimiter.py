@@ -0,0 +1,52 @@
+import time
+import threading
+from collections import OrderedDict
+
+class RateLimiter:
+    """
+    Token buckets keyed by client address, user name or anything hashable.
+
+    Each key may spend capacity requests at once and gets rate requests per
+    second back. Buckets live in an OrderedDict ordered by last use; a bucket
+    idle long enough to be full again carries no state and is dropped, and
+    when more than max_keys are tracked the least recently used one goes, so
+    a flood of distinct keys cannot grow memory without bound.
+    """
+    def __init__(self, rate, capacity, max_keys=100000, enabled=True):
+        self.enabled = enabled
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._refill_time = capacity / rate
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        while self._buckets:
+            key, (_, updated) = next(iter(self._buckets.items()))
+            if now - updated < self._refill_time and len(self._buckets) <= self.max_keys:
+                break
+            del self._buckets[key]
+
+    def allow(self, key, cost=1):
+        """Spending cost from the key's bucket, returns (allowed, seconds until allowed)"""
+        if not self.enabled:
+            return True, 0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = self.capacity
+            else:
+                tokens = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+                self._buckets.move_to_end(key)
+
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._evict(now)
+        return allowed, 0 if allowed else (cost - tokens) / self.rate
+
+    def __len__(self):
+        return len(self._buckets)
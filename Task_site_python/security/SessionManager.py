@@ -0,0 +1,116 @@
+import os
+import json
+import atexit
+import time
+import secrets
+import threading
+from collections import OrderedDict
+
+class SessionManager:
+    """
+    Logged-in customer sessions keyed by random session tokens.
+
+    Sessions live in an OrderedDict ordered by expiry. A lookup renews the TTL
+    once less than half of it is left and moves the session to the end, so
+    expired sessions always sit at the front and are evicted without scanning.
+    When more than max_sessions are open the one closest to expiry is dropped.
+    With persist_file set, sessions are also written to disk and survive a
+    server restart; changes are written at most once per flush_delay seconds by
+    a timer, so a login never waits for the whole session store to be saved,
+    and renewing in half-TTL steps keeps busy sessions from causing a write
+    on every request.
+    """
+    def __init__(self, ttl=24 * 60 * 60, max_sessions=100000, persist_file=None, flush_delay=1.0):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.persist_file = persist_file
+        self.flush_delay = flush_delay
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._flush_timer = None
+        if persist_file:
+            self._load()
+            atexit.register(self.flush)
+
+    def _load(self):
+        if not os.path.exists(self.persist_file):
+            return
+        try:
+            with open(self.persist_file, "r") as f:
+                sessions = json.load(f)
+        except json.JSONDecodeError:
+            return
+        for token, session in sorted(sessions.items(), key=lambda item: item[1]["expires"]):
+            self._sessions[token] = session
+        self._evict(time.time())
+
+    def _schedule_flush(self):
+        # Called with the lock held
+        if not self.persist_file:
+            return
+        self._dirty = True
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        """Writing the sessions to persist_file if they changed since the last write"""
+        with self._write_lock:
+            with self._lock:
+                self._flush_timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                # Sessions are small dicts, a shallow copy is enough to write
+                # without holding the lock
+                sessions = {token: dict(session) for token, session in self._sessions.items()}
+            temp_file = self.persist_file + ".tmp"
+            with open(temp_file, "w") as f:
+                json.dump(sessions, f)
+            os.replace(temp_file, self.persist_file)
+
+    def _evict(self, now):
+        while self._sessions:
+            token, session = next(iter(self._sessions.items()))
+            if session["expires"] > now and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[token]
+
+    def create(self, user):
+        token = secrets.token_urlsafe(32)
+        now = time.time()
+        with self._lock:
+            self._sessions[token] = {"user": user, "expires": now + self.ttl}
+            self._evict(now)
+            self._schedule_flush()
+        return token
+
+    def get(self, token):
+        if not token:
+            return None
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return None
+            if session["expires"] <= now:
+                del self._sessions[token]
+                return None
+            if session["expires"] - now < self.ttl / 2:
+                session["expires"] = now + self.ttl
+                self._sessions.move_to_end(token)
+                self._schedule_flush()
+            return session["user"]
+
+    def delete(self, token):
+        with self._lock:
+            session = self._sessions.pop(token, None)
+            if session is not None:
+                self._schedule_flush()
+            return session["user"] if session else None
+
+    def __len__(self):
+        return len(self._sessions)
@@ -1,13 +1,28 @@
 import os
 import json
+import atexit
 import hmac
 import secrets
+import time
+import threading
 import hashlib
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from base64 import b64encode, b64decode
 
+DEFAULT_SCOPES = ["menu", "orders"]
+
+# Tokens from the single-token config format have no id prefix
+LEGACY_TOKEN_ID = "legacy"
+
+# Failed attempts and lockouts are counted per client, so one client guessing
+# tokens can't lock every admin out; callers without an address share this key
+LOCAL_CLIENT = "local"
+MAX_TRACKED_CLIENTS = 10000
+
 class TokenManager:
-    def __init__(self, config_dir="../config", data_dir="../data"):
+    def __init__(self, config_dir="../config", data_dir="../data", cache_ttl=300, cache_size=128,
+                 flush_delay=1.0, hasher=None):
         self.salt_file = os.path.join(config_dir, "salt.key")
         self.config_file = os.path.join(data_dir, "token_config.json")
 
@@ -15,6 +30,28 @@ class TokenManager:
         os.makedirs(config_dir, exist_ok=True)
         os.makedirs(data_dir, exist_ok=True)
 
+        # Guards config when validating from several server workers
+        self._lock = threading.Lock()
+
+        # Recently verified tokens, keyed by an HMAC under a per-process key so
+        # repeated admin calls skip the 100k-round PBKDF2
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._cache_key = secrets.token_bytes(32)
+        self._verified_cache = OrderedDict()
+        self._sweeper = None
+        self._config_mtime = None
+
+        # Failed-attempt counters change in memory and are written at most once
+        # per flush_delay seconds; lockouts and token changes are written at once
+        self.flush_delay = flush_delay
+        self._dirty = False
+        self._flush_timer = None
+        atexit.register(self.flush)
+
+        # PBKDF2 runs on the hashing service's pool when one is given
+        self.hasher = hasher
+
         self.salt = self._load_or_generate_salt()
         self._load_config()
 
@@ -32,21 +69,109 @@ class TokenManager:
         if os.path.exists(self.config_file):
             with open(self.config_file, "r") as f:
                 self.config = json.load(f)
+            self._config_mtime = os.stat(self.config_file).st_mtime_ns
         else:
             self.config = {
-                "token_hash": None,
-                "expiry": None,
+                "tokens": {},
                 "max_failed_attempts": 5,
-                "failed_attempts": 0,
-                "lockout_until": None
+                "failed_attempts": {},
+                "lockout_until": {}
             }
             self._save_config()
 
-    def _save_config(self):
-        with open(self.config_file, "w") as f:
-            json.dump(self.config, f, indent=4)
+        # Counters of the old format were global, start per-client counting afresh
+        if not isinstance(self.config.get("failed_attempts"), dict) or \
+                not isinstance(self.config.get("lockout_until"), dict):
+            self.config["failed_attempts"] = {}
+            self.config["lockout_until"] = {}
+            self._save_config()
+
+        # Move a token from the old single-token format into the registry
+        if "token_hash" in self.config:
+            token_hash = self.config.pop("token_hash")
+            expiry = self.config.pop("expiry", None)
+            self.config.setdefault("tokens", {})
+            if token_hash and expiry:
+                self.config["tokens"][LEGACY_TOKEN_ID] = {
+                    "name": LEGACY_TOKEN_ID,
+                    "token_hash": token_hash,
+                    "expiry": expiry,
+                    "scopes": list(DEFAULT_SCOPES)
+                }
+            self._save_config(added=[LEGACY_TOKEN_ID] if token_hash and expiry else ())
+
+    def _read_config_file(self):
+        try:
+            with open(self.config_file, "r") as f:
+                return json.load(f), os.fstat(f.fileno()).st_mtime_ns
+        except (OSError, ValueError):
+            return None, None
+
+    def _save_config(self, added=(), removed=(), counters=True):
+        # The CLI admin panel and the server both write this file, so start
+        # from the tokens on disk and apply only this process's own changes;
+        # writing the in-memory registry back would drop the other's tokens.
+        # Token changes (counters=False) also keep the failed-attempt and
+        # lockout tables on disk, which this process may only hold stale
+        config = dict(self.config)
+        on_disk, _ = self._read_config_file()
+        if on_disk is not None and isinstance(on_disk.get("tokens"), dict):
+            tokens = on_disk["tokens"]
+            for token_id in removed:
+                tokens.pop(token_id, None)
+            for token_id in added:
+                tokens[token_id] = self.config["tokens"][token_id]
+            self.config["tokens"] = config["tokens"] = tokens
+            if not counters:
+                for key in ("failed_attempts", "lockout_until"):
+                    if isinstance(on_disk.get(key), dict):
+                        config[key] = on_disk[key]
+
+        # Write to a temp file and rename so a crash never leaves a torn config
+        temp_file = self.config_file + ".tmp"
+        with open(temp_file, "w") as f:
+            json.dump(config, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.config_file)
+        self._config_mtime = os.stat(self.config_file).st_mtime_ns
+        if counters:
+            self._dirty = False
+
+    def _schedule_flush(self):
+        self._dirty = True
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        """Writing pending failed-attempt counters, with the tokens currently on disk"""
+        with self._lock:
+            self._flush_timer = None
+            if self._dirty:
+                self._save_config()
+
+    def _refresh_tokens(self):
+        # Tokens generated or revoked by another process (the CLI admin panel) show up
+        # in the config file, reread it only when it has changed
+        try:
+            mtime = os.stat(self.config_file).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._config_mtime:
+            return
+        with self._lock:
+            on_disk, mtime = self._read_config_file()
+            if on_disk is None or not isinstance(on_disk.get("tokens"), dict):
+                return
+            # Replacing rather than updating also drops tokens revoked elsewhere
+            self.config["tokens"] = on_disk["tokens"]
+            self._config_mtime = mtime
 
     def _hash_token(self, token):
+        if self.hasher is not None:
+            return self.hasher.pbkdf2(token.encode(), self.salt, 100000)
         return hashlib.pbkdf2_hmac(
             'sha256',
             token.encode(),
@@ -54,52 +179,156 @@ class TokenManager:
             100000
         ).hex()
 
-    def generate_token(self):
-        token = secrets.token_urlsafe(32)
-        token_hash = self._hash_token(token)
+    @staticmethod
+    def _token_id(token):
+        token_id, separator, _ = token.partition(".")
+        return token_id if separator else LEGACY_TOKEN_ID
 
-        self.config["token_hash"] = token_hash
-        self.config["expiry"] = (datetime.now() + timedelta(hours=24)).isoformat()
-        self.config["failed_attempts"] = 0
-        self.config["lockout_until"] = None
+    def generate_token(self, name="admin", scopes=None, hours=24):
+        # The id prefix lets validation find the right hash with one lookup
+        token_id = secrets.token_hex(4)
+        while token_id in self.config["tokens"]:
+            token_id = secrets.token_hex(4)
+        token = f"{token_id}.{secrets.token_urlsafe(32)}"
+        token_hash = self._hash_token(token)
 
-        self._save_config()
+        with self._lock:
+            self.config["tokens"][token_id] = {
+                "name": name,
+                "token_hash": token_hash,
+                "expiry": (datetime.now() + timedelta(hours=hours)).isoformat(),
+                "scopes": list(scopes or DEFAULT_SCOPES)
+            }
+            self._save_config(added=[token_id], counters=False)
         return token
 
-    def validate_token(self, provided_token):
-        if self.config["lockout_until"]:
-            lockout_time = datetime.fromisoformat(self.config["lockout_until"])
-            if datetime.now() < lockout_time:
-                return False, "System is locked due to too many failed attempts"
+    def revoke_token(self, token_id):
+        self._refresh_tokens()
+        with self._lock:
+            if self.config["tokens"].pop(token_id, None) is None:
+                return False
+            self._verified_cache.clear()
+            self._save_config(removed=[token_id], counters=False)
+            return True
+
+    def list_tokens(self):
+        self._refresh_tokens()
+        with self._lock:
+            return {
+                token_id: {"name": entry["name"], "expiry": entry["expiry"], "scopes": entry["scopes"]}
+                for token_id, entry in self.config["tokens"].items()
+            }
+
+    def sweep_expired(self):
+        now = datetime.now()
+        with self._lock:
+            expired = [
+                token_id for token_id, entry in self.config["tokens"].items()
+                if datetime.fromisoformat(entry["expiry"]) < now
+            ]
+            for token_id in expired:
+                del self.config["tokens"][token_id]
+            if expired:
+                self._verified_cache.clear()
+                self._save_config(removed=expired, counters=False)
+        return len(expired)
+
+    def start_sweeper(self, interval=60):
+        """Removing expired tokens in a background thread every interval seconds"""
+        if self._sweeper is not None:
+            return
 
-        if not self.config["token_hash"] or not self.config["expiry"]:
-            return False, "No valid token configured"
+        def run():
+            while True:
+                time.sleep(interval)
+                self.sweep_expired()
 
-        expiry_time = datetime.fromisoformat(self.config["expiry"])
-        if datetime.now() > expiry_time:
-            return False, "Token has expired"
+        self._sweeper = threading.Thread(target=run, name="token-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def _cache_digest(self, token):
+        return hmac.new(self._cache_key, token.encode(), hashlib.sha256).digest()
+
+    def _is_cached(self, digest):
+        with self._lock:
+            cached_until = self._verified_cache.get(digest)
+            if cached_until is None:
+                return False
+            if cached_until <= time.time():
+                del self._verified_cache[digest]
+                return False
+            return True
+
+    def _cache_verified(self, digest, expiry_time):
+        self._verified_cache[digest] = min(expiry_time.timestamp(), time.time() + self.cache_ttl)
+        self._verified_cache.move_to_end(digest)
+        while len(self._verified_cache) > self.cache_size:
+            self._verified_cache.popitem(last=False)
+
+    def validate_token(self, provided_token, scope=None, client=LOCAL_CLIENT):
+        lockout_until = self.config["lockout_until"].get(client)
+        if lockout_until and datetime.now() < datetime.fromisoformat(lockout_until):
+            return False, "Locked out due to too many failed attempts"
 
         try:
-            provided_hash = self._hash_token(provided_token)
-            if not hmac.compare_digest(
-                provided_hash.encode(),
-                self.config["token_hash"].encode()
-            ):
-                self._handle_failed_attempt()
+            token_id = self._token_id(provided_token)
+            # A stat per call, the file is only reread when another process
+            # has added or revoked a token
+            self._refresh_tokens()
+            if not self.config["tokens"]:
+                return False, "No valid token configured"
+
+            entry = self.config["tokens"].get(token_id)
+            if entry is None:
+                with self._lock:
+                    self._handle_failed_attempt(client)
                 return False, "Invalid token"
 
-            self.config["failed_attempts"] = 0
-            self._save_config()
-            return True, "Token validated successfully"
+            expiry_time = datetime.fromisoformat(entry["expiry"])
+            if datetime.now() > expiry_time:
+                return False, "Token has expired"
+
+            digest = self._cache_digest(provided_token)
+            if self._is_cached(digest):
+                return self._check_scope(entry, scope)
+
+            provided_hash = self._hash_token(provided_token)
+            with self._lock:
+                if not hmac.compare_digest(
+                    provided_hash.encode(),
+                    entry["token_hash"].encode()
+                ):
+                    self._handle_failed_attempt(client)
+                    return False, "Invalid token"
+
+                self._cache_verified(digest, expiry_time)
+                # Only a reset counter is worth a disk write
+                if self.config["failed_attempts"].pop(client, None):
+                    self._schedule_flush()
+            return self._check_scope(entry, scope)
 
         except Exception as e:
             return False, f"Token validation error: {str(e)}"
 
-    def _handle_failed_attempt(self):
-        self.config["failed_attempts"] += 1
-        if self.config["failed_attempts"] >= self.config["max_failed_attempts"]:
-            self.config["lockout_until"] = (
-                datetime.now() + timedelta(minutes=30)
-            ).isoformat()
-            self.config["failed_attempts"] = 0
-        self._save_config()
\ No newline at end of file
+    @staticmethod
+    def _check_scope(entry, scope):
+        if scope is not None and scope not in entry["scopes"]:
+            return False, f"Token is not allowed to access {scope}"
+        return True, "Token validated successfully"
+
+    def _handle_failed_attempt(self, client):
+        failed_attempts = self.config["failed_attempts"]
+        # Re-inserting keeps the most recently failing clients at the end
+        failed_attempts[client] = failed_attempts.pop(client, 0) + 1
+        if failed_attempts[client] >= self.config["max_failed_attempts"]:
+            del failed_attempts[client]
+            now = datetime.now()
+            lockouts = self.config["lockout_until"]
+            for locked_client in [c for c, until in lockouts.items() if datetime.fromisoformat(until) <= now]:
+                del lockouts[locked_client]
+            lockouts[client] = (now + timedelta(minutes=30)).isoformat()
+            self._save_config()
+        else:
+            while len(failed_attempts) > MAX_TRACKED_CLIENTS:
+                del failed_attempts[next(iter(failed_attempts))]
+            self._schedule_flush()
@@ -0,0 +1,74 @@
+DEFAULT_MENU = {
+    "1": {"name": "Margherita", "price": 8.99},
+    "2": {"name": "Pepperoni", "price": 9.99},
+    "3": {"name": "Veggie", "price": 10.99}
+}
+
+class BaseStorage:
+    """
+    Interface every storage backend of the pizza server implements.
+
+    Orders are plain dicts with user, items, status, address, order_time and
+    delivery_time keys, the same shape as in data/orders.json.
+    """
+    def get_menu(self):
+        raise NotImplementedError
+
+    def menu_version(self):
+        """Value that changes whenever the menu changes"""
+        raise NotImplementedError
+
+    def add_pizza(self, name, price):
+        raise NotImplementedError
+
+    def delete_pizza(self, pizza_id):
+        raise NotImplementedError
+
+    def get_user(self, name):
+        raise NotImplementedError
+
+    def add_user(self, name, user):
+        raise NotImplementedError
+
+    def get_order(self, order_id):
+        raise NotImplementedError
+
+    def add_order(self, order_id, order):
+        raise NotImplementedError
+
+    def add_orders(self, orders):
+        """Storing a batch of {order_id: order} in one write"""
+        for order_id, order in orders.items():
+            self.add_order(order_id, order)
+
+    def update_order_status(self, order_id, status):
+        raise NotImplementedError
+
+    def update_order_statuses(self, updates):
+        """Storing a batch of {order_id: status} transitions"""
+        for order_id, status in updates.items():
+            self.update_order_status(order_id, status)
+
+    def delete_order(self, order_id):
+        raise NotImplementedError
+
+    def query_orders(self, user=None, status=None, since=None, until=None, address=None,
+                     after=None, limit=50):
+        """
+        Orders sorted by (order_time, order_id), returns a list of (order_id, order).
+
+        since/until are ISO timestamps, address matches case-insensitively as a
+        substring and after is the (order_time, order_id) of the last order of
+        the previous page.
+        """
+        raise NotImplementedError
+
+    def active_orders(self):
+        """Orders whose stored status is not delivered yet"""
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+    def close(self):
+        pass
@@ -0,0 +1,85 @@
+import os
+import time
+import threading
+
+class DataCache:
+    """
+    In-memory cache of parsed data files.
+
+    An entry is reloaded only when the file's mtime or size changes, and the
+    file is stat'ed at most once per check_interval seconds. Writes done by the
+    server itself go through put(), so they never cause a reload. Every load
+    and put() gives the entry a new version number, which callers can use to
+    tell whether something built from the data is still current.
+    """
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self.hits = 0
+        self.reloads = 0
+        self._last_version = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, path, loader):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                if now - entry["checked_at"] < self.check_interval:
+                    self.hits += 1
+                    return entry["data"]
+                if self._signature(path) == entry["signature"]:
+                    entry["checked_at"] = now
+                    self.hits += 1
+                    return entry["data"]
+
+            signature = self._signature(path)
+            data = loader()
+            self._last_version += 1
+            self._entries[path] = {
+                "data": data,
+                "signature": signature,
+                "checked_at": now,
+                "version": self._last_version
+            }
+            self.reloads += 1
+            return data
+
+    def put(self, path, data):
+        with self._lock:
+            self._last_version += 1
+            self._entries[path] = {
+                "data": data,
+                "signature": self._signature(path),
+                "checked_at": time.monotonic(),
+                "version": self._last_version
+            }
+
+    def version(self, path):
+        """Version of the cached entry for path, None when it is not cached"""
+        with self._lock:
+            entry = self._entries.get(path)
+            return entry["version"] if entry is not None else None
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "reloads": self.reloads,
+                "entries": len(self._entries)
+            }
@@ -0,0 +1,217 @@
+import os
+import copy
+import json
+import bisect
+import threading
+
+from storage.BaseStorage import BaseStorage, DEFAULT_MENU
+from storage.DataCache import DataCache
+from storage.OrderJournal import OrderJournal
+
+# Index entries examined per hold of the lock when listing orders, so a filter
+# that matches few orders never blocks writers for a whole index scan
+SCAN_CHUNK = 1000
+
+class JsonStorage(BaseStorage):
+    """
+    Storage backed by the data/*.json files.
+
+    The menu is cached and reloaded only when menu.json changes on disk, users
+    are kept in memory and orders go through an append-only OrderJournal.
+    Sorted (order_time, order_id) lists, one for all orders, one per user and
+    one per stored status, serve order listings without scanning every order.
+    """
+    def __init__(self, menu_file, users_file, orders_file):
+        self.menu_file = menu_file
+        self.users_file = users_file
+        self.cache = DataCache()
+        self.journal = OrderJournal(orders_file)
+        self.users = self._load_json(users_file, {}, "Users file is corrupted. Creating new users file.")
+        self.orders = self.journal.load()
+        self._lock = threading.RLock()
+        self._time_index = []
+        self._user_index = {}
+        self._status_index = {}
+        for order_id, order in self.orders.items():
+            key = (order["order_time"], order_id)
+            self._time_index.append(key)
+            self._user_index.setdefault(order["user"], []).append(key)
+            self._status_index.setdefault(order["status"], []).append(key)
+        self._time_index.sort()
+        for entries in (*self._user_index.values(), *self._status_index.values()):
+            entries.sort()
+
+    @staticmethod
+    def _load_json(path, default, warning):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    return json.load(f)
+            except json.JSONDecodeError:
+                print(f"Warning: {warning}")
+        return default
+
+    @staticmethod
+    def _save_json(path, data):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(data, f, indent=4)
+
+    def _load_menu(self):
+        return self._load_json(self.menu_file, copy.deepcopy(DEFAULT_MENU),
+                               "Menu file is corrupted. Loading default menu.")
+
+    @property
+    def menu(self):
+        return self.cache.get(self.menu_file, self._load_menu)
+
+    def get_menu(self):
+        return self.menu
+
+    def menu_version(self):
+        # Reloads of menu.json and own writes through put() both bump the
+        # version, reading the menu first picks up a changed file
+        self.get_menu()
+        return self.cache.version(self.menu_file)
+
+    def add_pizza(self, name, price):
+        with self._lock:
+            menu = self.menu
+            pizza_id = str(len(menu) + 1)
+            menu[pizza_id] = {"name": name, "price": price}
+            self._save_json(self.menu_file, menu)
+            self.cache.put(self.menu_file, menu)
+            return pizza_id
+
+    def delete_pizza(self, pizza_id):
+        with self._lock:
+            menu = self.menu
+            if pizza_id not in menu:
+                return False
+            del menu[pizza_id]
+            self._save_json(self.menu_file, menu)
+            self.cache.put(self.menu_file, menu)
+            return True
+
+    def get_user(self, name):
+        return self.users.get(name)
+
+    def add_user(self, name, user):
+        with self._lock:
+            if name in self.users:
+                return False
+            self.users[name] = user
+            self._save_json(self.users_file, self.users)
+            return True
+
+    def get_order(self, order_id):
+        return self.orders.get(order_id)
+
+    def _index_order(self, order_id, order):
+        key = (order["order_time"], order_id)
+        bisect.insort(self._time_index, key)
+        bisect.insort(self._user_index.setdefault(order["user"], []), key)
+        bisect.insort(self._status_index.setdefault(order["status"], []), key)
+
+    @staticmethod
+    def _remove_key(entries, key):
+        position = bisect.bisect_left(entries, key)
+        if position < len(entries) and entries[position] == key:
+            del entries[position]
+
+    def _unindex_order(self, order_id, order):
+        key = (order["order_time"], order_id)
+        self._remove_key(self._time_index, key)
+        self._remove_key(self._user_index.get(order["user"], []), key)
+        self._remove_key(self._status_index.get(order["status"], []), key)
+
+    def _reindex_statuses(self, previous):
+        """Moving orders whose status changed from previous {order_id: status}"""
+        for order_id, old_status in previous.items():
+            order = self.orders[order_id]
+            if order["status"] != old_status:
+                key = (order["order_time"], order_id)
+                self._remove_key(self._status_index.get(old_status, []), key)
+                bisect.insort(self._status_index.setdefault(order["status"], []), key)
+
+    def add_order(self, order_id, order):
+        with self._lock:
+            self.journal.record_create(order_id, order)
+            self._index_order(order_id, order)
+
+    def add_orders(self, orders):
+        with self._lock:
+            self.journal.record_creates(orders)
+            for order_id, order in orders.items():
+                self._index_order(order_id, order)
+
+    def update_order_status(self, order_id, status):
+        self.update_order_statuses({order_id: status})
+
+    def update_order_statuses(self, updates):
+        with self._lock:
+            previous = {
+                order_id: self.orders[order_id]["status"] for order_id in updates if order_id in self.orders
+            }
+            self.journal.record_statuses(updates)
+            self._reindex_statuses(previous)
+
+    def delete_order(self, order_id):
+        with self._lock:
+            order = self.orders.get(order_id)
+            if order is None:
+                return False
+            self.journal.record_cancel(order_id)
+            self._unindex_order(order_id, order)
+            return True
+
+    def query_orders(self, user=None, status=None, since=None, until=None, address=None,
+                     after=None, limit=50):
+        start = (since, "") if since else None
+        if after is not None and (start is None or tuple(after) > start):
+            key, search = tuple(after), bisect.bisect_right
+        elif start is not None:
+            key, search = start, bisect.bisect_left
+        else:
+            key, search = None, None
+
+        address = address.lower() if address else None
+        result = []
+        # Walk the index by position a chunk at a time, taking the lock per
+        # chunk and finding the place again by key, as writes may shift it
+        while True:
+            with self._lock:
+                if user is not None:
+                    entries = self._user_index.get(user, [])
+                elif status:
+                    entries = self._status_index.get(status, [])
+                else:
+                    entries = self._time_index
+                position = search(entries, key) if key is not None else 0
+                end = min(position + SCAN_CHUNK, len(entries))
+                for index in range(position, end):
+                    order_time, order_id = entries[index]
+                    if until and order_time > until:
+                        return result
+                    order = self.orders[order_id]
+                    if status and order["status"] != status:
+                        continue
+                    if address and address not in order["address"].lower():
+                        continue
+                    result.append((order_id, order))
+                    if len(result) >= limit:
+                        return result
+                if end == len(entries):
+                    return result
+                key, search = entries[end - 1], bisect.bisect_right
+
+    def active_orders(self):
+        with self._lock:
+            return {order_id: order for order_id, order in self.orders.items() if order["status"] != "delivered"}
+
+    def stats(self):
+        return dict(self.cache.stats(), backend="json")
+
+    def close(self):
+        self.journal.close()
@@ -0,0 +1,199 @@
+import os
+import json
+import threading
+
+class OrderJournal:
+    """
+    Orders kept in memory and persisted as a snapshot plus an append-only journal.
+
+    Every create, status change and cancel appends one JSON line to the journal,
+    so a write costs the same no matter how many orders exist. Once the journal
+    outgrows compact_ratio times the snapshot (and at least compact_min_bytes),
+    it is renamed to <journal>.old, a new journal is started and a background
+    thread writes the orders to a new snapshot (temp file + rename) before
+    deleting the old journal, so writers never wait for a snapshot. Loading
+    replays the old journal, if a compaction was cut short, and then the
+    journal on top of the snapshot; a torn last line left by a crash is cut off.
+    """
+    def __init__(self, snapshot_file, journal_file=None, compact_ratio=1.0,
+                 compact_min_bytes=1024 * 1024, fsync=True):
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file or snapshot_file + ".journal"
+        self.old_journal_file = self.journal_file + ".old"
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self.fsync = fsync
+        self.orders = {}
+        self._journal = None
+        self._journal_bytes = 0
+        self._snapshot_bytes = 0
+        self._compactor = None
+        self._lock = threading.RLock()
+
+    def load(self):
+        with self._lock:
+            self.wait_for_compaction()
+            os.makedirs(os.path.dirname(self.snapshot_file) or ".", exist_ok=True)
+            self.orders = self._read_snapshot()
+            interrupted = os.path.exists(self.old_journal_file)
+            if interrupted:
+                self._replay_journal(self.old_journal_file)
+            self._replay_journal(self.journal_file)
+            if self._journal is not None:
+                self._journal.close()
+
+            if interrupted:
+                # Finish the compaction a crash interrupted before appending again
+                self._write_snapshot(self.orders)
+                os.remove(self.old_journal_file)
+                self._journal = open(self.journal_file, "w", encoding="utf-8")
+            else:
+                self._journal = open(self.journal_file, "a", encoding="utf-8")
+            self._journal_bytes = self._journal.tell()
+            self._snapshot_bytes = os.path.getsize(self.snapshot_file) if os.path.exists(self.snapshot_file) else 0
+            return self.orders
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.snapshot_file):
+            return {}
+        try:
+            with open(self.snapshot_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            print("Warning: Orders snapshot is corrupted. Rebuilding orders from the journal.")
+            return {}
+
+    def _replay_journal(self, journal_file):
+        if not os.path.exists(journal_file):
+            return 0
+        replayed = 0
+        good_end = 0
+        with open(journal_file, "rb") as f:
+            for line in f:
+                # A record is complete only with its newline
+                try:
+                    record = json.loads(line) if line.endswith(b"\n") else None
+                except ValueError:
+                    record = None
+                if record is None:
+                    print("Warning: Skipping torn record at the end of the orders journal.")
+                    break
+                self._apply(record)
+                replayed += 1
+                good_end += len(line)
+        # Appending after torn bytes would glue the next record to them and
+        # lose it on the next replay, so cut the journal back to the last good record
+        if good_end < os.path.getsize(journal_file):
+            os.truncate(journal_file, good_end)
+        return replayed
+
+    def _apply(self, record):
+        op = record["op"]
+        order_id = record["id"]
+        if op == "create":
+            self.orders[order_id] = record["order"]
+        elif op == "status" and order_id in self.orders:
+            self.orders[order_id]["status"] = record["status"]
+        elif op == "cancel":
+            self.orders.pop(order_id, None)
+
+    def _append(self, *records):
+        for record in records:
+            self._apply(record)
+            line = json.dumps(record, separators=(",", ":")) + "\n"
+            self._journal.write(line)
+            self._journal_bytes += len(line.encode("utf-8"))
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+        if self._compactor is None and self._journal_bytes >= max(
+                self.compact_min_bytes, self._snapshot_bytes * self.compact_ratio):
+            self.compact(wait=False)
+
+    def record_create(self, order_id, order):
+        with self._lock:
+            self._append({"op": "create", "id": order_id, "order": order})
+
+    def record_creates(self, orders):
+        """Appending a batch of new orders with a single flush"""
+        with self._lock:
+            self._append(*[
+                {"op": "create", "id": order_id, "order": order}
+                for order_id, order in orders.items()
+            ])
+
+    def record_status(self, order_id, status):
+        with self._lock:
+            self._append({"op": "status", "id": order_id, "status": status})
+
+    def record_statuses(self, updates):
+        """Appending a batch of status changes with a single flush"""
+        with self._lock:
+            self._append(*[
+                {"op": "status", "id": order_id, "status": status}
+                for order_id, status in updates.items()
+            ])
+
+    def record_cancel(self, order_id):
+        with self._lock:
+            self._append({"op": "cancel", "id": order_id})
+
+    def _write_snapshot(self, orders):
+        temp_file = self.snapshot_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(orders, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.snapshot_file)
+        return os.path.getsize(self.snapshot_file)
+
+    def compact(self, wait=True):
+        """
+        Starting a new journal and writing all orders to a fresh snapshot in the
+        background; only the journal swap and a shallow copy of the orders happen
+        under the lock
+        """
+        with self._lock:
+            if self._compactor is not None:
+                if wait:
+                    self.wait_for_compaction()
+                return
+            if os.path.exists(self.old_journal_file):
+                # A failed compaction left it behind, it is only replaced by load()
+                return
+            self._journal.close()
+            os.replace(self.journal_file, self.old_journal_file)
+            self._journal = open(self.journal_file, "w", encoding="utf-8")
+            self._journal_bytes = 0
+            # Status changes made after the copy may reach the snapshot too,
+            # they are in the new journal as well and replaying them is harmless
+            orders = dict(self.orders)
+            self._compactor = threading.Thread(
+                target=self._finish_compaction, args=(orders,), name="journal-compactor", daemon=True
+            )
+            self._compactor.start()
+        if wait:
+            self.wait_for_compaction()
+
+    def _finish_compaction(self, orders):
+        try:
+            snapshot_bytes = self._write_snapshot(orders)
+            os.remove(self.old_journal_file)
+            self._snapshot_bytes = snapshot_bytes
+        except OSError as error:
+            # The old journal stays, load() replays it and finishes the compaction
+            print(f"Warning: Compacting the orders journal failed: {error}")
+        finally:
+            self._compactor = None
+
+    def wait_for_compaction(self):
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def close(self):
+        self.wait_for_compaction()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
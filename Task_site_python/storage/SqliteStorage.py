@@ -0,0 +1,244 @@
+import os
+import json
+import sqlite3
+import threading
+
+from storage.BaseStorage import BaseStorage, DEFAULT_MENU
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS menu (
+    pizza_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    price REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS users (
+    name TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    street TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    user TEXT NOT NULL,
+    items TEXT NOT NULL,
+    status TEXT NOT NULL,
+    address TEXT NOT NULL,
+    order_time TEXT NOT NULL,
+    delivery_time TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_user ON orders (user, order_time);
+CREATE INDEX IF NOT EXISTS idx_orders_order_time ON orders (order_time);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status);
+"""
+
+class SqliteStorage(BaseStorage):
+    """
+    Storage backed by a single SQLite database in WAL mode.
+
+    Every thread gets its own connection, so several server workers can read
+    while one of them writes.
+    """
+    def __init__(self, db_file):
+        self.db_file = db_file
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._menu_changes = 0
+
+        conn = self._connection()
+        is_new = conn.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'menu'"
+        ).fetchone()[0] == 0
+        conn.executescript(SCHEMA)
+        if is_new:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO menu (pizza_id, name, price) VALUES (?, ?, ?)",
+                    [(pizza_id, pizza["name"], pizza["price"]) for pizza_id, pizza in DEFAULT_MENU.items()]
+                )
+
+    def _connection(self):
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @staticmethod
+    def _order_from_row(row):
+        return {
+            "user": row["user"],
+            "items": json.loads(row["items"]),
+            "status": row["status"],
+            "address": row["address"],
+            "order_time": row["order_time"],
+            "delivery_time": row["delivery_time"]
+        }
+
+    @staticmethod
+    def _order_params(order_id, order):
+        return (
+            order_id,
+            order["user"],
+            json.dumps(order["items"]),
+            order["status"],
+            order["address"],
+            order["order_time"],
+            order["delivery_time"]
+        )
+
+    def get_menu(self):
+        rows = self._connection().execute("SELECT pizza_id, name, price FROM menu")
+        return {row["pizza_id"]: {"name": row["name"], "price": row["price"]} for row in rows}
+
+    def menu_version(self):
+        return self._menu_changes
+
+    def add_pizza(self, name, price):
+        conn = self._connection()
+        with conn:
+            count = conn.execute("SELECT COUNT(*) FROM menu").fetchone()[0]
+            pizza_id = str(count + 1)
+            conn.execute(
+                "INSERT OR REPLACE INTO menu (pizza_id, name, price) VALUES (?, ?, ?)",
+                (pizza_id, name, price)
+            )
+        self._menu_changes += 1
+        return pizza_id
+
+    def delete_pizza(self, pizza_id):
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute("DELETE FROM menu WHERE pizza_id = ?", (pizza_id,))
+        self._menu_changes += 1
+        return cursor.rowcount > 0
+
+    def get_user(self, name):
+        row = self._connection().execute(
+            "SELECT password, street FROM users WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"password": row["password"], "street": row["street"]}
+
+    def add_user(self, name, user):
+        conn = self._connection()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO users (name, password, street) VALUES (?, ?, ?)",
+                    (name, user["password"], user["street"])
+                )
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def get_order(self, order_id):
+        row = self._connection().execute(
+            "SELECT * FROM orders WHERE order_id = ?", (order_id,)
+        ).fetchone()
+        return self._order_from_row(row) if row is not None else None
+
+    def add_order(self, order_id, order):
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?)", self._order_params(order_id, order))
+
+    def add_orders(self, orders):
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [self._order_params(order_id, order) for order_id, order in orders.items()]
+            )
+
+    def update_order_status(self, order_id, status):
+        conn = self._connection()
+        with conn:
+            conn.execute("UPDATE orders SET status = ? WHERE order_id = ?", (status, order_id))
+
+    def update_order_statuses(self, updates):
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "UPDATE orders SET status = ? WHERE order_id = ?",
+                [(status, order_id) for order_id, status in updates.items()]
+            )
+
+    def delete_order(self, order_id):
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute("DELETE FROM orders WHERE order_id = ?", (order_id,))
+        return cursor.rowcount > 0
+
+    def query_orders(self, user=None, status=None, since=None, until=None, address=None,
+                     after=None, limit=50):
+        conditions = []
+        params = []
+        if user is not None:
+            conditions.append("user = ?")
+            params.append(user)
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if since:
+            conditions.append("order_time >= ?")
+            params.append(since)
+        if until:
+            conditions.append("order_time <= ?")
+            params.append(until)
+        if address:
+            conditions.append("address LIKE ?")
+            params.append(f"%{address}%")
+        if after is not None:
+            conditions.append("(order_time, order_id) > (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._connection().execute(
+            f"SELECT * FROM orders {where} ORDER BY order_time, order_id LIMIT ?",
+            params + [limit]
+        )
+        return [(row["order_id"], self._order_from_row(row)) for row in rows]
+
+    def active_orders(self):
+        rows = self._connection().execute("SELECT * FROM orders WHERE status != 'delivered'")
+        return {row["order_id"]: self._order_from_row(row) for row in rows}
+
+    def import_json(self, source):
+        """Copying menu, users and orders from a JsonStorage in one transaction"""
+        conn = self._connection()
+        self._menu_changes += 1
+        with conn:
+            conn.execute("DELETE FROM menu")
+            conn.executemany(
+                "INSERT INTO menu (pizza_id, name, price) VALUES (?, ?, ?)",
+                [(pizza_id, pizza["name"], pizza["price"]) for pizza_id, pizza in source.get_menu().items()]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO users (name, password, street) VALUES (?, ?, ?)",
+                [(name, user["password"], user["street"]) for name, user in source.users.items()]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [self._order_params(order_id, order) for order_id, order in source.orders.items()]
+            )
+        return {
+            "menu": len(source.get_menu()),
+            "users": len(source.users),
+            "orders": len(source.orders)
+        }
+
+    def stats(self):
+        return {"backend": "sqlite", "connections": len(self._connections)}
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
@@ -0,0 +1,87 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import JsonStorage as json_storage
+from storage.JsonStorage import JsonStorage
+
+def make_order(index, user="alice", status="pending"):
+    return {
+        "user": user,
+        "items": [{"pizza_id": "1", "quantity": 1}],
+        "status": status,
+        "address": f"Street {index % 7}",
+        "order_time": f"2025-01-01T12:{index // 60 % 60:02d}:{index % 60:02d}",
+        "delivery_time": "2025-01-01T13:00:00"
+    }
+
+class JsonStorageQueryTest(unittest.TestCase):
+    """Order listings and /orders/export read all orders page by page through a cursor"""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        path = self.directory.name
+        self.storage = JsonStorage(os.path.join(path, "menu.json"), os.path.join(path, "users.json"),
+                                   os.path.join(path, "orders.json"))
+        self.storage.journal.fsync = False
+        # Small chunks so the pages below cross several chunks of the index
+        self.scan_chunk = json_storage.SCAN_CHUNK
+        json_storage.SCAN_CHUNK = 16
+        self.storage.add_orders({
+            f"order{index:04d}": make_order(index, user="alice" if index % 3 else "bob",
+                                            status="delivered" if index % 4 == 0 else "pending")
+            for index in range(500)
+        })
+
+    def tearDown(self):
+        json_storage.SCAN_CHUNK = self.scan_chunk
+        self.storage.close()
+        self.directory.cleanup()
+
+    def read_all(self, page_size=37, **filters):
+        orders = []
+        after = None
+        while True:
+            page = self.storage.query_orders(after=after, limit=page_size, **filters)
+            orders.extend(page)
+            if len(page) < page_size:
+                return orders
+            order_id, order = page[-1]
+            after = (order["order_time"], order_id)
+
+    def expected(self, predicate=lambda order: True):
+        orders = sorted(self.storage.orders.items(), key=lambda item: (item[1]["order_time"], item[0]))
+        return [(order_id, order) for order_id, order in orders if predicate(order)]
+
+    def test_pages_cover_every_order_once_in_order(self):
+        self.assertEqual(self.read_all(), self.expected())
+
+    def test_filters_across_pages(self):
+        self.assertEqual(self.read_all(status="delivered"),
+                         self.expected(lambda order: order["status"] == "delivered"))
+        self.assertEqual(self.read_all(user="bob", status="pending"),
+                         self.expected(lambda order: order["user"] == "bob" and order["status"] == "pending"))
+        self.assertEqual(self.read_all(address="street 3"),
+                         self.expected(lambda order: order["address"] == "Street 3"))
+
+    def test_status_filter_follows_status_changes(self):
+        self.storage.update_order_statuses({f"order{index:04d}": "delivered" for index in range(1, 100, 2)})
+        self.storage.update_order_status("order0001", "cancelled")
+        self.storage.delete_order("order0004")
+        for status in ("pending", "delivered", "cancelled"):
+            self.assertEqual(self.read_all(status=status),
+                             self.expected(lambda order: order["status"] == status))
+        self.assertEqual(self.read_all(status="unknown"), [])
+
+    def test_since_until_and_cursor(self):
+        orders = self.read_all(since="2025-01-01T12:02:00", until="2025-01-01T12:05:59")
+        self.assertEqual(orders, self.expected(
+            lambda order: "2025-01-01T12:02:00" <= order["order_time"] <= "2025-01-01T12:05:59"))
+        order_id, order = orders[10]
+        after = self.storage.query_orders(after=(order["order_time"], order_id), limit=5)
+        self.assertEqual(after, self.expected()[self.expected().index((order_id, order)) + 1:][:5])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.OrderJournal import OrderJournal
+
+def make_order(user="alice"):
+    return {
+        "user": user,
+        "items": [{"pizza_id": "1", "quantity": 1}],
+        "status": "pending",
+        "address": "Main Street",
+        "order_time": "2025-01-01T12:00:00",
+        "delivery_time": "2025-01-01T12:30:00"
+    }
+
+class OrderJournalReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.snapshot_file = os.path.join(self.directory.name, "orders.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def open_journal(self):
+        journal = OrderJournal(self.snapshot_file, fsync=False)
+        journal.load()
+        self.addCleanup(journal.close)
+        return journal
+
+    def test_replays_records_on_top_of_snapshot(self):
+        journal = self.open_journal()
+        journal.record_create("a", make_order())
+        journal.record_create("b", make_order())
+        journal.record_status("a", "preparing")
+        journal.record_cancel("b")
+        journal.close()
+
+        orders = self.open_journal().orders
+        self.assertEqual(list(orders), ["a"])
+        self.assertEqual(orders["a"]["status"], "preparing")
+
+    def test_records_written_after_a_torn_record_survive_restarts(self):
+        journal = self.open_journal()
+        journal.record_create("a", make_order())
+        journal.close()
+        with open(journal.journal_file, "a", encoding="utf-8") as f:
+            f.write('{"op": "create", "id": "b", "ord')
+
+        journal = self.open_journal()
+        self.assertEqual(list(journal.orders), ["a"])
+        journal.record_create("c", make_order())
+        journal.record_create("d", make_order())
+        journal.close()
+
+        self.assertEqual(sorted(self.open_journal().orders), ["a", "c", "d"])
+
+    def test_complete_json_without_newline_is_torn(self):
+        journal = self.open_journal()
+        journal.record_create("a", make_order())
+        journal.close()
+        with open(journal.journal_file, "a", encoding="utf-8") as f:
+            f.write('{"op": "cancel", "id": "a"}')
+
+        journal = self.open_journal()
+        self.assertEqual(list(journal.orders), ["a"])
+        journal.record_create("b", make_order())
+        journal.close()
+
+        self.assertEqual(sorted(self.open_journal().orders), ["a", "b"])
+
+class OrderJournalCompactionTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.snapshot_file = os.path.join(self.directory.name, "orders.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def open_journal(self, **options):
+        journal = OrderJournal(self.snapshot_file, fsync=False, **options)
+        journal.load()
+        self.addCleanup(journal.close)
+        return journal
+
+    def test_compaction_keeps_writes_made_while_snapshotting(self):
+        journal = self.open_journal(compact_min_bytes=0)
+        for number in range(50):
+            journal.record_create(f"order{number}", make_order())
+        journal.compact(wait=False)
+        journal.record_create("late", make_order())
+        journal.record_status("order1", "delivered")
+        journal.record_cancel("order2")
+        journal.close()
+
+        self.assertFalse(os.path.exists(journal.old_journal_file))
+        orders = self.open_journal().orders
+        self.assertEqual(len(orders), 50)
+        self.assertIn("late", orders)
+        self.assertNotIn("order2", orders)
+        self.assertEqual(orders["order1"]["status"], "delivered")
+
+    def test_compacts_when_journal_outgrows_snapshot(self):
+        journal = self.open_journal(compact_min_bytes=4096)
+        for number in range(200):
+            journal.record_create(f"order{number}", make_order())
+        journal.wait_for_compaction()
+        # Appends made while a compaction runs only trigger the next one
+        journal.record_create("last", make_order())
+        journal.wait_for_compaction()
+        self.assertTrue(os.path.exists(self.snapshot_file))
+        self.assertLess(os.path.getsize(journal.journal_file), os.path.getsize(self.snapshot_file) + 4096)
+        journal.close()
+        self.assertEqual(len(self.open_journal().orders), 201)
+
+    def test_load_finishes_interrupted_compaction(self):
+        journal = self.open_journal()
+        journal.record_create("a", make_order())
+        journal.record_create("b", make_order())
+        journal.close()
+        # Crash after the journal swap, before the snapshot was written
+        os.replace(journal.journal_file, journal.old_journal_file)
+        with open(journal.journal_file, "w", encoding="utf-8") as f:
+            f.write('{"op":"cancel","id":"a"}\n{"op":"create","id":"c","order":{"status":"pending"}}\n')
+
+        journal = self.open_journal()
+        self.assertEqual(sorted(journal.orders), ["b", "c"])
+        self.assertFalse(os.path.exists(journal.old_journal_file))
+        journal.close()
+        self.assertEqual(sorted(self.open_journal().orders), ["b", "c"])
+
+if __name__ == "__main__":
+    unittest.main()